@@ -1,28 +1,48 @@
 
+import datetime as dt
+from typing import Iterable
+
+import pytz
+from django.conf import settings
 from django.utils.timezone import get_current_timezone
 from django.utils.translation import gettext_lazy as _
 
 from core.logic.appointments_actions import make_an_appointment
-from core.logic.appointments_info import (get_all_appointments,
-                                          get_occupied_appointments,
-                                          get_available_appointments)
-from core.logic.custom_exceptions import MethodNotFound, ProcessorNotFound
+from core.logic.appointments_info import AppointmentInfo, iter_available_appointments
+from core.logic.batch import KIND_WORKLOAD, run_batch
+from core.logic.bulk_appointments import ACTION_CREATE, BULK_ACTIONS
+from core.logic.custom_exceptions import (MethodNotFound, ProcessorNotFound,
+                                         WrongArgumentsHasBeenPassed)
+from core.logic.idempotency import IDEMPOTENCY_KEY_HEADER, run_idempotent
+from core.logic.next_available import find_next_available
+from core.logic.workload import Workload, get_workload
+from core.utils.dateutils import get_timezone_offsets
 from core.utils.message_formers import form_error
 from core.utils.parser import parse_get, parse_post, parse_datetime
 
 
 class BaseContextProcessor(object):
+    # request fields parsed as datetimes, the others are passed as is
+    datetime_fields = ()
 
     @staticmethod
     def get_timezone(data):
-        return data.get("timezone", get_current_timezone())
+        timezone = data.get("timezone", get_current_timezone())
+        if isinstance(timezone, dt.tzinfo):
+            return timezone
+        if not isinstance(timezone, str):
+            raise pytz.UnknownTimeZoneError(timezone)
+        return pytz.timezone(timezone)
 
     @classmethod
     def process(cls, request, *args, **kwargs):
         handler_method_name = 'process_{}'.format(request.method)
         handler = getattr(cls, handler_method_name.lower(),
                           cls.http_method_not_found)
-        return handler(request, *args, **kwargs)
+        try:
+            return handler(request, *args, **kwargs)
+        except (pytz.UnknownTimeZoneError, WrongArgumentsHasBeenPassed):
+            return form_error(_("Wrong arguments"))
 
     @classmethod
     def http_method_not_found(cls, request, *args, **kwargs):
@@ -30,13 +50,20 @@ class BaseContextProcessor(object):
 
 
 class MakeAppointmentLogic(BaseContextProcessor):
+    datetime_fields = ("time", "new_time")
 
     @classmethod
     def process_post(cls, request):
         data = parse_post(request)
 
+        # retries of a request sent with the same key get the first response
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        return run_idempotent(request.user.id, "make_appointment", key, data, lambda: cls.make_appointment(request, data))
+
+    @classmethod
+    def make_appointment(cls, request, data: dict) -> dict:
         timezone = cls.get_timezone(data)
-        data = parse_datetime(data, timezone=timezone)
+        data = parse_datetime(dict(data), timezone=timezone, fields=cls.datetime_fields)
 
         data.update({
             'user_id': request.user.id
@@ -49,13 +76,14 @@ class MakeAppointmentLogic(BaseContextProcessor):
 
 
 class CheckRepairShopWorkloadLogic(BaseContextProcessor):
+    datetime_fields = ("date", "datetime_begin", "datetime_end")
 
     @classmethod
     def process_get(cls, request):
         data = parse_get(request)
 
         timezone = cls.get_timezone(data)
-        data = parse_datetime(data, timezone=timezone)
+        data = parse_datetime(data, timezone=timezone, fields=cls.datetime_fields)
 
         workload = cls.get_workload(data)
         return workload
@@ -63,22 +91,19 @@ class CheckRepairShopWorkloadLogic(BaseContextProcessor):
     @classmethod
     def get_workload(cls, data: dict) -> dict:
 
-        def _perc(v1: float, v2: float):
-            return round(v1 / v2 * 100, 2) if v2 else None
-
         try:
-            all_appointments = get_all_appointments(**data)
-            occupied_appointments = get_occupied_appointments(**data)
+            workload = get_workload(**data)
         except ProcessorNotFound:
             return form_error(_("Wrong arguments"))
 
-        all_appointments_cnt = len(all_appointments)
-        occupied_appointments_cnt = len(occupied_appointments)
+        return cls.form_workload(workload)
 
-        if all_appointments_cnt == 0:
+    @classmethod
+    def form_workload(cls, workload: Workload) -> dict:
+        if workload.total == 0:
             return form_error(_("No appointments available for chosen date"))
 
-        perc = _perc(occupied_appointments_cnt, all_appointments_cnt)
+        perc = workload.percent
 
         msg = _("Current workload")
         workload = f"{msg}: {perc}%"
@@ -90,34 +115,36 @@ class CheckRepairShopWorkloadLogic(BaseContextProcessor):
 
 
 class GetAvailableAppointmentTimeLogic(BaseContextProcessor):
+    datetime_fields = ("date", "datetime_begin", "datetime_end")
 
     @classmethod
     def process_get(cls, request):
         data = parse_get(request)
 
         timezone = cls.get_timezone(data)
-        data = parse_datetime(data, timezone=timezone)
+        data = parse_datetime(data, timezone=timezone, fields=cls.datetime_fields)
 
         result = cls.get_available_time(data)
         return result
 
     @classmethod
     def get_available_time(cls, data: dict) -> dict:
-        available_time = []
-
         try:
-            available_appointments = get_available_appointments(**data)
+            available_appointments = iter_available_appointments(**data)
         except ProcessorNotFound:
             return form_error(_("Wrong arguments"))
 
+        return cls.form_available_time(available_appointments, cls.get_timezone(data))
+
+    @classmethod
+    def form_available_time(cls, available_appointments: Iterable[AppointmentInfo], timezone) -> dict:
         date_format = '%Y/%m/%d %H:%M'
-        timezone = cls.get_timezone(data)
 
-        for appointment in available_appointments:
-            available_time.append(appointment.datetime_begin)
+        available_time = {appointment.datetime_begin for appointment in available_appointments}
 
-        appointments = sorted(set(available_time))
-        appointments = [apt.astimezone(timezone).strftime(date_format) for apt in appointments]
+        appointments = sorted(available_time)
+        tz_offsets = get_timezone_offsets(timezone)
+        appointments = [tz_offsets.to_local(apt).strftime(date_format) for apt in appointments]
 
         msg = _("Available time")
         workload = f"{msg}: {'; '.join(appointments)}"
@@ -126,3 +153,117 @@ class GetAvailableAppointmentTimeLogic(BaseContextProcessor):
             "is_error": False,
             "info": workload
         }
+
+
+class FindNextAvailableLogic(BaseContextProcessor):
+    datetime_fields = ("after",)
+
+    @classmethod
+    def process_get(cls, request):
+        data = parse_get(request)
+
+        timezone = cls.get_timezone(data)
+        data = parse_datetime(data, timezone=timezone, fields=cls.datetime_fields)
+
+        result = cls.find_next_available(data)
+        return result
+
+    @classmethod
+    def find_next_available(cls, data: dict) -> dict:
+        try:
+            limit = int(data.get("limit") or 1)
+        except ValueError:
+            return form_error(_("Wrong arguments"))
+
+        limit = max(1, min(limit, getattr(settings, "NEXT_AVAILABLE_MAX_LIMIT", 100)))
+
+        try:
+            appointments = find_next_available(
+                repair_shop_id=data.get("repair_shop_id"),
+                workman_id=data.get("workman_id"),
+                after=data.get("after"),
+                limit=limit,
+            )
+        except ProcessorNotFound:
+            return form_error(_("Wrong arguments"))
+
+        if not appointments:
+            return form_error(_("No appointments available"))
+
+        date_format = '%Y/%m/%d %H:%M'
+        tz_offsets = get_timezone_offsets(cls.get_timezone(data))
+
+        msg = _("Available time")
+        available_time = [tz_offsets.to_local(apt.datetime_begin).strftime(date_format) for apt in appointments]
+
+        return {
+            "is_error": False,
+            "info": f"{msg}: {'; '.join(available_time)}",
+            "slots": [
+                {
+                    "workman_id": apt.workman_id,
+                    "datetime_begin": tz_offsets.to_local(apt.datetime_begin).strftime(date_format),
+                    "datetime_end": tz_offsets.to_local(apt.datetime_end).strftime(date_format),
+                }
+                for apt in appointments
+            ]
+        }
+
+
+class BatchAvailabilityLogic(BaseContextProcessor):
+    datetime_fields = ("date", "datetime_begin", "datetime_end")
+
+    @classmethod
+    def process_post(cls, request):
+        data = parse_post(request)
+
+        timezone = cls.get_timezone(data)
+        queries = data.get("queries")
+        if not isinstance(queries, list) or not all(isinstance(query, dict) for query in queries):
+            return form_error(_("Wrong arguments"))
+
+        max_queries = getattr(settings, "BATCH_AVAILABILITY_MAX_QUERIES", 100)
+        if len(queries) > max_queries:
+            return form_error(_("Too many queries"))
+
+        queries = [parse_datetime(dict(query), timezone=timezone, fields=cls.datetime_fields) for query in queries]
+        return {
+            "is_error": False,
+            "results": [cls.form_item(item, timezone) for item in run_batch(queries)]
+        }
+
+    @classmethod
+    def form_item(cls, item, timezone) -> dict:
+        if item.error is not None:
+            return form_error(_("Wrong arguments"))
+
+        if item.kind == KIND_WORKLOAD:
+            return CheckRepairShopWorkloadLogic.form_workload(item.result)
+        return GetAvailableAppointmentTimeLogic.form_available_time(item.result, timezone)
+
+
+class BulkAppointmentsLogic(BaseContextProcessor):
+    datetime_fields = ("time", "new_time")
+
+    @classmethod
+    def process_post(cls, request):
+        data = parse_post(request)
+
+        timezone = cls.get_timezone(data)
+        action = BULK_ACTIONS.get(data.get("action", ACTION_CREATE))
+        items = data.get("items")
+        if action is None or not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return form_error(_("Wrong arguments"))
+
+        max_items = getattr(settings, "BULK_APPOINTMENTS_MAX_ITEMS", 100)
+        if len(items) > max_items:
+            return form_error(_("Too many appointments"))
+
+        items = [parse_datetime(dict(item), timezone=timezone, fields=cls.datetime_fields) for item in items]
+        return {
+            "is_error": False,
+            "results": [
+                {"is_error": is_error, "info": msg}
+                for is_error, msg in action(items, user_id=request.user.id)
+            ]
+        }
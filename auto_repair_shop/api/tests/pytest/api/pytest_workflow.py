@@ -1,12 +1,14 @@
 
 import json
+from unittest import mock
 
 import pytest
 from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from core.models import User
+from core.models import Appointments, User
 from core.tests.pytests.data_generators import SimpleTestDataGenerator
 
 
@@ -72,6 +74,60 @@ class TestAppointmentsProcessors(APITestCase, SimpleTestDataGenerator):
         is_error, _ = response.data['is_error'], response.data['info']
         self.assertTrue(is_error)
 
+    @pytest.mark.django_db
+    def test_MakeAppointment_POST_with_wrong_duration(self):
+        self.generate_data()
+        token = self.get_token()
+
+        view_path = reverse("make_appointment")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        for duration in ("abc", 3600.0, [3600]):
+            request = {
+                "time": "2020-08-05 11:00",
+                "workman_id": 1,
+                "timezone": "UTC",
+                "duration": duration,
+            }
+            response = self.client.post(view_path, json.dumps(request),
+                                        HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, {"is_error": True, "info": _("Wrong arguments")})
+
+        self.assertFalse(Appointments.objects.filter(workman_id=1, time__hour=11).exists())
+
+    @pytest.mark.django_db
+    def test_MakeAppointment_POST_with_idempotency_key(self):
+        self.generate_data()
+        token = self.get_token()
+
+        request = {
+            "time": "2020-08-05 11:00",
+            "workman_id": 1,
+            "timezone": "UTC",
+        }
+        view_path = reverse("make_appointment")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        def post(request, key):
+            return self.client.post(view_path, json.dumps(request),
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                    HTTP_IDEMPOTENCY_KEY=key,
+                                    content_type='application/json').data
+
+        first = post(request, "key-1")
+        self.assertFalse(first['is_error'])
+
+        # a retry gets the first answer instead of "time is not available"
+        with mock.patch("api.logic.workflow.make_an_appointment") as booking:
+            self.assertEqual(post(request, "key-1"), first)
+        booking.assert_not_called()
+        self.assertEqual(Appointments.objects.filter(workman_id=1, time__hour=11).count(), 1)
+
+        self.assertTrue(post({**request, "time": "2020-08-05 12:00"}, "key-1")['is_error'])
+        self.assertTrue(post(request, "key-2")['is_error'])
+
     @pytest.mark.django_db
     def test_CheckRepairShopWorkload_GET(self):
         self.generate_data()
@@ -155,3 +211,93 @@ class TestAppointmentsProcessors(APITestCase, SimpleTestDataGenerator):
                                     content_type='application/json')
 
         self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @pytest.mark.django_db
+    def test_FindNextAvailable_GET(self):
+        self.generate_data()
+        token = self.get_token()
+
+        request = {
+            "after": "2020-08-05 09:00",
+            "workman_id": 1,
+            "limit": 2,
+            "timezone": "UTC",
+        }
+        view_path = reverse("find_next_available")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(view_path, data=request)
+
+        is_error, slots = response.data['is_error'], response.data['slots']
+        self.assertFalse(is_error)
+        self.assertEqual([slot["datetime_begin"] for slot in slots], ["2020/08/05 11:00", "2020/08/05 12:00"])
+
+    @pytest.mark.django_db
+    def test_BatchAvailability_POST(self):
+        self.generate_data()
+        token = self.get_token()
+
+        request = {
+            "timezone": "UTC",
+            "queries": [
+                {"date": "2020-08-05", "workman_id": 1},
+                {"date": "2020-08-05", "workman_id": 1, "kind": "workload"},
+                {"kind": "workload"},
+            ]
+        }
+        view_path = reverse("batch_availability")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.post(view_path, json.dumps(request),
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                    content_type='application/json')
+
+        available_time, workload, wrong = response.data['results']
+        self.assertTrue("2020/08/05 11:00" in available_time['info'])
+        self.assertTrue("75" in workload['info'])
+        self.assertTrue(wrong['is_error'])
+
+    @pytest.mark.django_db
+    def test_BulkAppointments_POST(self):
+        self.generate_data()
+        token = self.get_token()
+
+        view_path = reverse("bulk_appointments")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        def post(request):
+            response = self.client.post(view_path, json.dumps({"timezone": "UTC", **request}),
+                                        HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                        content_type='application/json')
+            return [result['is_error'] for result in response.data['results']]
+
+        items = [
+            {"time": "2020-08-05 11:00", "workman_id": 1},
+            {"time": "2020-08-05 11:00", "workman_id": 2},
+            {"time": "2020-08-05 09:00", "workman_id": 1},
+        ]
+        self.assertEqual(post({"items": items}), [False, False, True])
+
+        moves = [{**items[0], "new_time": "2020-08-05 12:00"}]
+        self.assertEqual(post({"action": "move", "items": moves}), [False])
+        self.assertEqual(post({"action": "delete", "items": [items[1], items[1]]}), [False, True])
+
+    @pytest.mark.django_db
+    def test_unknown_timezone(self):
+        self.generate_data()
+        token = self.get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        request = {"date": "2020-08-05", "repair_shop_id": 1, "timezone": "Mars/Olympus"}
+        response = self.client.get(reverse("check_workload"), data=request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"is_error": True, "info": _("Wrong arguments")})
+
+        for view_name, request in (
+            ("make_appointment", {"time": "2020-08-05 11:00", "workman_id": 1, "timezone": "Mars/Olympus"}),
+            ("bulk_appointments", {"items": [{"time": "2020-08-05 11:00", "workman_id": 1}], "timezone": 3}),
+        ):
+            response = self.client.post(reverse(view_name), json.dumps(request),
+                                        HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                        content_type='application/json')
+            self.assertEqual(response.data, {"is_error": True, "info": _("Wrong arguments")})
+
+        self.assertFalse(Appointments.objects.filter(workman_id=1, time__hour=11).exists())
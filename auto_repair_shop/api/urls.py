@@ -4,7 +4,10 @@ from django.contrib import admin
 from django.urls import path
 from rest_framework_simplejwt import views as jwt_views
 
-from api.views.workflow import (CheckRepairShopWorkload,
+from api.views.workflow import (BatchAvailability,
+                                BulkAppointments,
+                                CheckRepairShopWorkload,
+                                FindNextAvailable,
                                 GetAvailableAppointmentTime,
                                 MakeAppointment)
 
@@ -18,4 +21,7 @@ urlpatterns = [
     path('make_appointment/', MakeAppointment.as_view(), name='make_appointment'),
     path('check_workload/', CheckRepairShopWorkload.as_view(), name='check_workload'),
     path('get_available_appointment_time/', GetAvailableAppointmentTime.as_view(), name='get_available_appointment_time'),
+    path('find_next_available/', FindNextAvailable.as_view(), name='find_next_available'),
+    path('batch_availability/', BatchAvailability.as_view(), name='batch_availability'),
+    path('bulk_appointments/', BulkAppointments.as_view(), name='bulk_appointments'),
 ]
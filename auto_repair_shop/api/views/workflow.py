@@ -3,7 +3,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from api.logic.workflow import (CheckRepairShopWorkloadLogic,
+from api.logic.workflow import (BatchAvailabilityLogic,
+                                BulkAppointmentsLogic,
+                                CheckRepairShopWorkloadLogic,
+                                FindNextAvailableLogic,
                                 MakeAppointmentLogic,
                                 GetAvailableAppointmentTimeLogic)
 
@@ -36,3 +39,18 @@ class CheckRepairShopWorkload(BaseApiView):
 class GetAvailableAppointmentTime(BaseApiView):
     context_class = GetAvailableAppointmentTimeLogic
     http_method_names = ['get']
+
+
+class FindNextAvailable(BaseApiView):
+    context_class = FindNextAvailableLogic
+    http_method_names = ['get']
+
+
+class BatchAvailability(BaseApiView):
+    context_class = BatchAvailabilityLogic
+    http_method_names = ['post']
+
+
+class BulkAppointments(BaseApiView):
+    context_class = BulkAppointmentsLogic
+    http_method_names = ['post']
@@ -0,0 +1,36 @@
+
+import pytest
+
+from core.logic.occupancy_index import occupancy_index
+from core.models.work_regime import work_regime_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # test databases are rolled back without signals, so ids might be reused
+    work_regime_cache.clear()
+    occupancy_index.clear()
+    yield
+    work_regime_cache.clear()
+    occupancy_index.clear()
+
+
+@pytest.fixture(autouse=True)
+def utc_time_zone(settings):
+    # fixtures and expected values are written in UTC, the project runs in Europe/Moscow
+    settings.TIME_ZONE = "UTC"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-benchmarks", action="store_true", default=False,
+                     help="run the wall-clock comparisons marked as benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+
+    skip = pytest.mark.skip(reason="wall-clock benchmark, run with --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
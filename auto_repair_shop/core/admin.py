@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
 from core.forms import UserCreationForm, UserChangeForm
+from core.logic import slot_availability
+from core.logic.occupancy_index import occupancy_index
 from core.models import (Appointments, AppointmentsArchive, RepairShop, User,
                          UserCar, Workman, WorkRegime, WorkRegimeDetail,
                          WorkRegimeExceptions)
@@ -28,6 +30,32 @@ class CustomUserAdmin(UserAdmin):
     ordering = tuple()
 
 
+class AppointmentsAdmin(admin.ModelAdmin):
+    # admin writes bypass core.logic.appointments_actions, so the occupancy index is rebuilt
+    # and the slots table is synced for the whole horizon
+
+    @staticmethod
+    def _sync(workman_ids):
+        occupancy_index.clear()
+        if slot_availability.is_enabled():
+            for workman_id in set(workman_ids):
+                slot_availability.sync_workman(workman_id)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # the previous workman loses the appointment when it is reassigned
+        self._sync([obj.workman_id, form.initial.get("workman", obj.workman_id)])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._sync([obj.workman_id])
+
+    def delete_queryset(self, request, queryset):
+        workman_ids = list(queryset.values_list("workman_id", flat=True))
+        super().delete_queryset(request, queryset)
+        self._sync(workman_ids)
+
+
 admin.site.register(User, UserAdmin)
 
 admin.site.register(RepairShop)
@@ -37,4 +65,4 @@ admin.site.register(WorkRegime)
 admin.site.register(WorkRegimeExceptions)
 admin.site.register(WorkRegimeDetail)
 admin.site.register(AppointmentsArchive)
-admin.site.register(Appointments)
+admin.site.register(Appointments, AppointmentsAdmin)
@@ -1,15 +1,24 @@
 
 import datetime as dt
-import inspect
 from dataclasses import dataclass
+from typing import Iterable, Optional
 
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
-from core.logic.appointments_info import get_available_appointments
-from core.logic.custom_exceptions import ProcessorNotFound
+from core.logic import slot_availability
+from core.logic.appointments_info import AppointmentTotalInfo
+from core.logic.booking_queue import get_booking_writer
+from core.logic.custom_exceptions import WrongArgumentsHasBeenPassed
+from core.logic.identity_map import get_workman_work_regime
+from core.logic.interval_index import IntervalIndex
+from core.logic.occupancy_index import get_occupancy_index
+from core.logic.schedule import WorkRegimeSchedule
 from core.models.staff import Workman
 from core.models.workflow import Appointments, AppointmentsArchive
-from core.utils.dateutils import string_to_date
+from core.utils.binder import ArgsBinder, to_datetime, to_int
+from core.utils.dateutils import get_timezone_offsets
 
 
 @dataclass
@@ -18,21 +27,52 @@ class AppointmentArgs:
     new_time: dt.datetime = None
     workman_id: int = None
     user_id: int = None
+    duration: int = None
 
     @classmethod
-    def proc_item(cls, key, val) -> dict:
-        if key in ('time', 'new_time'):
-            if type(val) == str:
-                val = string_to_date(val)
+    def from_dict(cls, env: dict):
+        return cls(**_appointment_args_binder.bind(env))
 
-        return val
 
-    @classmethod
-    def from_dict(cls, env: dict):
-        return cls(**{
-            k: cls.proc_item(k, v) for k, v in env.items()
-            if k in inspect.signature(cls).parameters
-        })
+_appointment_args_binder = ArgsBinder(AppointmentArgs, {
+    "time": to_datetime,
+    "new_time": to_datetime,
+    "workman_id": to_int,
+    "user_id": to_int,
+    "duration": to_int,
+})
+
+
+def is_on_schedule(schedule: WorkRegimeSchedule, _time: dt.datetime, duration: int) -> bool:
+    """
+        Whether every slot covered by the appointment is on the grid of its day,
+        the previous day is checked too as its shift might finish on the next one.
+    """
+    local_date = get_timezone_offsets().to_local(_time).date()
+    for _date in (local_date, local_date - dt.timedelta(days=1)):
+        day_schedule = schedule.get_day(_date)
+        if day_schedule is not None and day_schedule.covers(_date, _time, duration):
+            return True
+    return False
+
+
+def lock_workmen(workman_ids: Iterable[int]):
+    # serialises bookings of the same workmen (a no-op on SQLite, which serialises writers anyway),
+    # so appointments overlapping with a different begin can't slip between the check and the write
+    list(Workman.objects.select_for_update().filter(id__in=list(workman_ids)).values_list("id"))
+
+
+def mark_booking(workman_id: int, _time: dt.datetime, duration: int, is_occupied: bool):
+    """
+        Reflects a committed booking change in the occupancy index and the slots table.
+    """
+    occupancy_index = get_occupancy_index()
+    if occupancy_index is not None:
+        occupancy_index.mark(workman_id, _time, duration, is_occupied)
+
+    if slot_availability.is_enabled():
+        end = _time + dt.timedelta(seconds=duration)
+        slot_availability.sync_workman(workman_id, _time, end)
 
 
 class AppointmentsModelCommunicator(object):
@@ -42,15 +82,10 @@ class AppointmentsModelCommunicator(object):
         self.from_archive = kw.get("from_archive", False)
         self.filter_args = AppointmentArgs.from_dict(kw)
 
-    @property
+    @cached_property
     def work_regime(self):
-        return Workman.objects.get(
-            id=self.filter_args.workman_id
-        ).repair_shop.default_work_regime
-
-    @property
-    def work_regime_details(self):
-        return self.work_regime.get_wrd(self.date)
+        # the regime slots are generated by, as WorkmanProcessor picks it
+        return get_workman_work_regime(self.filter_args.workman_id)
 
     @property
     def date(self):
@@ -63,8 +98,20 @@ class AppointmentsModelCommunicator(object):
             return self.filter_args.new_time.date()
 
     @property
-    def duration(self):
-        return self.work_regime_details.appointment_duration
+    def duration(self) -> Optional[int]:
+        """
+            Requested duration or a single slot of the day, None when the day is not on the schedule.
+        """
+        # appointment might take several consecutive slots
+        if self.filter_args.duration:
+            return self.filter_args.duration
+
+        schedule = self._get_schedule()
+        if schedule is None or not isinstance(self.filter_args.time, dt.datetime):
+            return None
+
+        day_schedule = schedule.get_day(get_timezone_offsets().to_local(self.filter_args.time).date())
+        return day_schedule.appointment_duration if day_schedule is not None else None
 
     @property
     def _orm_model(self):
@@ -87,92 +134,168 @@ class AppointmentsModelCommunicator(object):
         msg = _("Appointment not found") if not record else _("Success")
         return record, msg
 
-    def _check_if_time_available(self, _time):
-        is_exist = self._orm_model.objects.filter(
-            workman_id=self.filter_args.workman_id,
-            date=_time.date(),
-            time=_time
-        ).exists()
+    def _check_if_time_available(self, _time, duration, exclude_id=None):
+        occupancy_index = get_occupancy_index()
+        end = _time + dt.timedelta(seconds=duration)
+
+        if occupancy_index is not None and not self.from_archive and exclude_id is None:
+            is_exist = occupancy_index.is_occupied(self.filter_args.workman_id, self.work_regime, _time, duration)
+        else:
+            # appointments never last longer than a work day
+            qs = self._orm_model.objects.filter(
+                workman_id=self.filter_args.workman_id,
+                time__gt=_time - dt.timedelta(days=1),
+                time__lt=end,
+            )
+            if exclude_id is not None:
+                qs = qs.exclude(id=exclude_id)
+
+            is_exist = IntervalIndex(qs.values_list("time", "duration")).overlaps(_time, end)
 
         msg = _("Chosen time is not available") if is_exist else _("Success")
         return is_exist, msg
 
-    def _check_if_time_valid(self, _time):
-        args = {
-            "date": _time.date(),
-            "workman_id": self.filter_args.workman_id,
-        }
+    def _get_schedule(self) -> Optional[WorkRegimeSchedule]:
         try:
-            appointments = get_available_appointments(**args)
-        except ProcessorNotFound:
+            work_regime = self.work_regime
+        except Workman.DoesNotExist:
+            return None
+        return WorkRegimeSchedule.get(work_regime) if work_regime is not None else None
+
+    def _check_if_time_valid(self, _time, duration):
+        if self.filter_args.workman_id is None:
             return True, _("Wrong arguments")
 
-        for appointment in appointments:
-            if appointment.datetime_begin == _time:
-                return False, _("Success")
+        schedule = self._get_schedule()
+        if schedule is None:
+            return True, _("Chosen time is not valid")
+
+        if is_on_schedule(schedule, _time, duration):
+            return False, _("Success")
 
         return True, _("Chosen time is not valid")
 
-    def _check_time(self, _time):
-        is_error, msg = self._check_if_time_available(_time)
+    def _check_time(self, _time, duration, exclude_id=None):
+        is_error, msg = self._check_if_time_available(_time, duration, exclude_id)
         if is_error:
             return is_error, msg
 
-        is_error, msg = self._check_if_time_valid(_time)
+        is_error, msg = self._check_if_time_valid(_time, duration)
         if is_error:
             return is_error, msg
 
         return False, None
 
-    def _create(self):
+    def _create(self, duration):
         self._orm_model.objects.create(
             customer_id=self.filter_args.user_id,
             workman_id=self.filter_args.workman_id,
             date=self.date,
             time=self.filter_args.time,
             work_regime=self.work_regime,
-            duration=self.duration,
+            duration=duration,
         )
 
+    def _lock_workman(self):
+        lock_workmen([self.filter_args.workman_id])
+
     def create(self):
-        is_error, msg = self._check_time(self.filter_args.time)
-        if not is_error:
-            self._create()
+        if self.filter_args.workman_id is None:
+            return True, _("Wrong arguments")
+
+        duration = self.duration
+        if duration is None:
+            return True, _("Chosen time is not valid")
+
+        try:
+            with transaction.atomic():
+                self._lock_workman()
+                is_error, msg = self._check_time(self.filter_args.time, duration)
+                if is_error:
+                    return is_error, msg
+                self._create(duration)
+        except IntegrityError:
+            # the same slot has been booked concurrently
+            return True, _("Chosen time is not available")
+        except OperationalError:
+            # the database refused the lock (e.g. "database is locked"), the client may retry
+            return True, _("Appointment service is busy, try again later")
+
+        self._mark(self.filter_args.time, duration, is_occupied=True)
+        AppointmentTotalInfo.clear_scope_cache()
         return is_error, msg
 
     def delete(self):
         rec, msg = self._get_record()
         if rec:
             rec.delete()
+            self._mark(rec.time, rec.duration, is_occupied=False)
+            AppointmentTotalInfo.clear_scope_cache()
             return False, msg
 
         return True, msg
 
-    def _move(self, rec, new_time):
-        rec.date = self.new_date
-        rec.time = new_time
-        rec.save()
+    def _mark(self, _time, duration, is_occupied: bool):
+        if not self.from_archive:
+            mark_booking(self.filter_args.workman_id, _time, duration, is_occupied)
 
     def move(self):
         rec, msg = self._get_record()
         if not rec:
             return True, msg
 
-        new_time = self.filter_args.new_time
+        old_time, new_time = rec.time, self.filter_args.new_time
 
-        is_error, msg = self._check_time(new_time)
-        if not is_error:
-            self._move(rec, new_time)
+        try:
+            with transaction.atomic():
+                self._lock_workman()
+                is_error, msg = self._check_time(new_time, rec.duration, exclude_id=rec.id)
+                if is_error:
+                    return is_error, msg
+
+                rec.date = self.new_date
+                rec.time = new_time
+                rec.save()
+        except IntegrityError:
+            return True, _("Chosen time is not available")
+        except OperationalError:
+            return True, _("Appointment service is busy, try again later")
+
+        self._mark(old_time, rec.duration, is_occupied=False)
+        self._mark(new_time, rec.duration, is_occupied=True)
+        AppointmentTotalInfo.clear_scope_cache()
         return is_error, msg
 
 
+def _apply(action: str, args: dict):
+    try:
+        communicator = AppointmentsModelCommunicator(**args)
+    except WrongArgumentsHasBeenPassed:
+        return True, _("Wrong arguments")
+    return getattr(communicator, action)()
+
+
+def run_booking(func, *args):
+    """
+        Runs a booking command, through the single writer when BOOKING_QUEUE is on.
+    """
+    writer = get_booking_writer()
+    if writer is None or writer.is_writer_thread:
+        return func(*args)
+
+    result = writer.submit(func, *args).result()
+    # the command has cleared the scope of the writer thread
+    AppointmentTotalInfo.clear_scope_cache()
+    return result
+
+
 def make_an_appointment(**args):
-    return AppointmentsModelCommunicator(**args).create()
+    return run_booking(_apply, "create", args)
 
 
 def move_an_appointment(**args):
-    return AppointmentsModelCommunicator(**args).move()
+    return run_booking(_apply, "move", args)
 
 
 def delete_an_appointment(**args):
-    return AppointmentsModelCommunicator(**args).delete()
+    return run_booking(_apply, "delete", args)
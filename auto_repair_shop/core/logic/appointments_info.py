@@ -1,22 +1,31 @@
 
 import datetime as dt
-import inspect
-from dataclasses import asdict, dataclass
-from typing import List
+from array import array
+from collections.abc import Sequence
+from dataclasses import astuple, dataclass
+from types import MappingProxyType
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from django.db.models import Q, QuerySet
-from django.utils.timezone import make_aware, get_current_timezone
+from django.utils.functional import cached_property
 
 from core.logic.custom_exceptions import ProcessorNotFound, WrongArgumentsHasBeenPassed
-from core.models.repair_shop import RepairShop
+from core.logic.identity_map import get_repair_shop, get_workman_work_regime
+from core.logic.interval_index import WorkmenIntervals
+from core.logic.occupancy_index import get_occupancy_index
+from core.logic.request_scope import clear_scope_cache, get_scope_cache
+from core.logic.schedule import WorkRegimeSchedule
 from core.models.staff import Workman
 from core.models.work_regime import WorkRegime
 from core.models.workflow import Appointments, AppointmentsArchive
-from core.utils.dateutils import string_to_date
+from core.utils.binder import ArgsBinder, to_date, to_datetime, to_int
+from core.utils.dateutils import TimezoneOffsets, get_timezone_offsets
 
 
 @dataclass
 class AppointmentInfo:
+    __slots__ = ("repair_shop_id", "workman_id", "datetime_begin", "datetime_end", "duration", "is_occupied")
+
     repair_shop_id: int
     workman_id: int
     datetime_begin: dt.datetime
@@ -25,6 +34,136 @@ class AppointmentInfo:
     is_occupied: bool
 
 
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+_MICROSECOND = dt.timedelta(microseconds=1)
+
+
+class AppointmentInfoList(Sequence):
+    """
+        Columnar storage of AppointmentInfo items (~20 bytes per slot).
+        Keeps begin time in epoch microseconds, workman id, duration and an occupancy bitfield,
+        repair shop id is stored once per workman. Items are built back on access.
+    """
+
+    def __init__(self, appointments: Iterable[AppointmentInfo] = ()):
+        super().__init__()
+        self._begins = array("q")
+        self._workman_ids = array("q")
+        self._durations = array("I")
+        self._occupied = bytearray()
+        self._repair_shop_ids = {}
+        self._size = 0
+
+        for appointment in appointments:
+            self.append(appointment)
+
+    def append(self, appointment: AppointmentInfo):
+        idx = self._size
+        if idx % 8 == 0:
+            self._occupied.append(0)
+        if appointment.is_occupied:
+            self._occupied[-1] |= 1 << (idx % 8)
+
+        self._begins.append((appointment.datetime_begin - _EPOCH) // _MICROSECOND)
+        self._workman_ids.append(appointment.workman_id)
+        self._durations.append(appointment.duration)
+        self._repair_shop_ids[appointment.workman_id] = appointment.repair_shop_id
+        self._size += 1
+
+    def is_occupied(self, idx: int) -> bool:
+        return bool(self._occupied[idx // 8] & (1 << (idx % 8)))
+
+    def _get_item(self, idx: int, tz_offsets: TimezoneOffsets) -> AppointmentInfo:
+        workman_id = self._workman_ids[idx]
+        duration = self._durations[idx]
+        datetime_begin = tz_offsets.to_local(_EPOCH + self._begins[idx] * _MICROSECOND)
+
+        return AppointmentInfo(
+            self._repair_shop_ids[workman_id],
+            workman_id,
+            datetime_begin,
+            datetime_begin + dt.timedelta(seconds=duration),
+            duration,
+            self.is_occupied(idx)
+        )
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        tz_offsets = get_timezone_offsets()
+        if isinstance(idx, slice):
+            return [self._get_item(i, tz_offsets) for i in range(*idx.indices(self._size))]
+
+        if idx < 0:
+            idx += self._size
+        if not 0 <= idx < self._size:
+            raise IndexError("AppointmentInfoList index out of range")
+        return self._get_item(idx, tz_offsets)
+
+    def __iter__(self):
+        tz_offsets = get_timezone_offsets()
+        for idx in range(self._size):
+            yield self._get_item(idx, tz_offsets)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self._begins, self._workman_ids, self._durations)
+        return sum(a.itemsize * len(a) for a in arrays) + len(self._occupied)
+
+    def select(self, is_occupied: bool) -> "AppointmentInfoSelection":
+        return AppointmentInfoSelection(self, is_occupied)
+
+
+class AppointmentInfoSelection(Sequence):
+    """
+        Free or occupied items of an AppointmentInfoList, picked by its occupancy bitfield.
+        Positions are looked up on the first access, the items themselves are not copied.
+    """
+
+    def __init__(self, appointments: AppointmentInfoList, is_occupied: bool):
+        super().__init__()
+        self.appointments = appointments
+        self.is_occupied = is_occupied
+
+    @cached_property
+    def _indexes(self) -> array:
+        appointments = self.appointments
+        return array("I", (idx for idx in range(len(appointments))
+                           if appointments.is_occupied(idx) == self.is_occupied))
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __getitem__(self, idx):
+        tz_offsets = get_timezone_offsets()
+        if isinstance(idx, slice):
+            return [self.appointments._get_item(i, tz_offsets) for i in self._indexes[idx]]
+        return self.appointments._get_item(self._indexes[idx], tz_offsets)
+
+    def __iter__(self):
+        tz_offsets = get_timezone_offsets()
+        for idx in self._indexes:
+            yield self.appointments._get_item(idx, tz_offsets)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+
+WORKMEN_SCOPE_CACHE_NAME = "workmen"
+
+
+def get_workmen_key(work_regime_id: int, workman_ids: List[int] = None) -> tuple:
+    return work_regime_id, tuple(workman_ids) if workman_ids else None
+
+
 # Very base classes
 
 class BaseDataProcessor(object):
@@ -33,6 +172,9 @@ class BaseDataProcessor(object):
         super().__init__()
         self.from_archive = kw.get("from_archive", False)
         self.filter_args = kw
+        self.occupied = WorkmenIntervals()
+        # the index is built from the live appointments only
+        self.occupancy_index = None if self.from_archive else get_occupancy_index()
 
     @property
     def _orm_model(self):
@@ -50,85 +192,90 @@ class BaseDataProcessor(object):
     def filter_qs(self, qs: QuerySet):
         raise NotImplementedError
 
-    def process_qs(self, qs: QuerySet):
+    def iter_targets(self) -> Iterator[Tuple[WorkRegime, Optional[List[int]]]]:
         raise NotImplementedError
 
-    def collect_appointments(self) -> List[AppointmentInfo]:
-        qs = self.get_qs()
-        qs = self.filter_qs(qs)
-        appointments = self.process_qs(qs)
-        return appointments
-
-    def _process_workman_day(self, qs: QuerySet, _date: dt.date,
-                             wrd: QuerySet, workman: QuerySet,
-                             wt_begin: dt.datetime = None,
-                             wt_end: dt.datetime = None, **kwargs) -> List[AppointmentInfo]:
-
-        def _comb(v1: dt.date, v2: dt.time) -> dt.datetime:
-            return make_aware(dt.datetime.combine(v1, v2), get_current_timezone())
-
-        def is_lunchtime(lt_begin: dt.datetime, lt_end: dt.datetime, cur_time: dt.datetime) -> bool:
-            if any(val is None for val in (lt_begin, lt_end, cur_time)):
-                return False
-            else:
-                return lt_begin <= cur_time and cur_time < lt_end
-
-        res = []
-
-        repair_shop_id = workman.repair_shop.id
-        appointment_dur = wrd.appointment_duration
-
-        work_time_begin = _comb(_date, wrd.work_time_begin)
-        work_time_end = _comb(_date, wrd.work_time_end)
+    def iter_days(self) -> Iterator[Tuple[dt.date, Optional[dt.datetime], Optional[dt.datetime]]]:
+        raise NotImplementedError
 
-        if wt_begin:
-            work_time_begin = max(wt_begin, work_time_begin)
+    def process_qs(self, qs: QuerySet) -> Iterator[AppointmentInfo]:
+        for work_regime, workman_ids in self.iter_targets():
+            yield from self._process(qs, work_regime, workman_ids=workman_ids)
 
-        if wt_end:
-            work_time_end = min(wt_end, work_time_end)
+    @staticmethod
+    def get_workman_qs(work_regime: WorkRegime, workman_ids: List[int] = None) -> QuerySet:
+        if workman_ids:
+            return Workman.objects.filter(id__in=workman_ids)
 
-        lunch_time_begin = None
-        if wrd.lunch_time_begin:
-            lunch_time_begin = _comb(_date, wrd.lunch_time_begin)
+        return Workman.objects.filter(
+            Q(repair_shop__default_work_regime=work_regime) | Q(individual_work_regime=work_regime),
+            repair_shop_id=work_regime.repair_shop_id,
+        )
 
-        lunch_time_end = None
-        if wrd.lunch_time_end:
-            lunch_time_end = _comb(_date, wrd.lunch_time_end)
+    @classmethod
+    def get_workmen(cls, work_regime: WorkRegime, workman_ids: List[int] = None) -> List[Workman]:
+        # memoized in the request scope (core.logic.batch prefetches them for several processors)
+        cache = get_scope_cache(WORKMEN_SCOPE_CACHE_NAME)
+        if cache is None:
+            return list(cls.get_workman_qs(work_regime, workman_ids))
+
+        key = get_workmen_key(work_regime.id, workman_ids)
+        if key not in cache:
+            cache[key] = list(cls.get_workman_qs(work_regime, workman_ids))
+        return cache[key]
+
+    @staticmethod
+    def get_occupied(qs: QuerySet) -> WorkmenIntervals:
+        # one query for the whole filtered range instead of one per slot
+        return WorkmenIntervals.from_qs(qs)
+
+    def iter_appointments(self, occupied: WorkmenIntervals = None) -> Iterator[AppointmentInfo]:
+        qs = self.get_qs()
+        qs = self.filter_qs(qs)
+        if self.occupancy_index is None:
+            self.occupied = self.get_occupied(qs) if occupied is None else occupied
+        yield from self.process_qs(qs)
 
-        if wrd.shift_finish_on_next_day:
-            work_time_end += dt.timedelta(days=1)
+    def collect_appointments(self) -> List[AppointmentInfo]:
+        return list(self.iter_appointments())
 
-        _current_time_begin = work_time_begin
+    def iter_available_appointments(self, occupied: WorkmenIntervals = None) -> Iterator[AppointmentInfo]:
+        from core.logic import slot_availability
 
-        while _current_time_begin < work_time_end:
-            _current_time_end = _current_time_begin + dt.timedelta(seconds=appointment_dur)
+        if slot_availability.is_enabled():
+            slots = slot_availability.iter_available_slots(self)
+            if slots is not None:
+                return slots
 
-            if is_lunchtime(lunch_time_begin, lunch_time_end, _current_time_begin):
-                _current_time_begin = _current_time_end
-                continue
+        return (apnt for apnt in self.iter_appointments(occupied) if not apnt.is_occupied)
 
-            appointment = qs.filter(
-                time=_current_time_begin,
-                workman=workman
-            ).first()
+    @staticmethod
+    def get_schedule(work_regime: WorkRegime) -> WorkRegimeSchedule:
+        return WorkRegimeSchedule.get(work_regime)
 
-            is_occupied = bool(appointment)
+    def _process_workman_day(self, slots: List[Tuple[dt.datetime, dt.datetime]],
+                             workman: Workman, appointment_dur: int,
+                             bitmap: int = None, first_idx: int = 0) -> Iterator[AppointmentInfo]:
+        """
+            bitmap: booked slots of the day from the occupancy index, slots[0] is the slot number first_idx
+        """
+        repair_shop_id = workman.repair_shop_id
 
-            res.append(
-                AppointmentInfo(
-                    repair_shop_id,
-                    workman.id,
-                    _current_time_begin,
-                    _current_time_end,
-                    appointment_dur,
-                    is_occupied
-                )
+        for idx, (datetime_begin, datetime_end) in enumerate(slots, first_idx):
+            if bitmap is None:
+                is_occupied = self.occupied.overlaps(workman.id, datetime_begin, datetime_end)
+            else:
+                is_occupied = bool(bitmap >> idx & 1)
+
+            yield AppointmentInfo(
+                repair_shop_id,
+                workman.id,
+                datetime_begin,
+                datetime_end,
+                appointment_dur,
+                is_occupied
             )
 
-            _current_time_begin = _current_time_end
-
-        return res
-
 
 class BaseDateProcessor(BaseDataProcessor):
 
@@ -142,30 +289,38 @@ class BaseDateProcessor(BaseDataProcessor):
             "date": self.date,
         }
 
-    def _process_day(self, qs: QuerySet, work_regime: QuerySet, **kwargs) -> List[AppointmentInfo]:
-        res = []
-
+    def _process_day(self, qs: QuerySet, work_regime: QuerySet, **kwargs) -> Iterator[AppointmentInfo]:
         _date = kwargs.get("date", self.date)
 
-        wrd = work_regime.get_wrd(_date)
-        if not wrd:
-            return res
+        day_schedule = self.get_schedule(work_regime).get_day(_date)
+        if not day_schedule:
+            return
 
-        repair_shop = wrd.work_regime.repair_shop
+        # slot grid is shared by all workmen of the regime
+        wt_begin, wt_end = kwargs.get("wt_begin"), kwargs.get("wt_end")
+        slots = day_schedule.project(_date, wt_begin, wt_end)
+        if not slots:
+            return
 
-        workman_ids = kwargs.get('workman_ids')
-        if workman_ids:
-            workman_qs = Workman.objects.filter(id__in=workman_ids)
-        else:
-            workman_qs = Workman.objects.filter(
-                Q(repair_shop__default_work_regime=wrd.work_regime) | Q(individual_work_regime=wrd.work_regime),
-                repair_shop=repair_shop,
-            )
+        first_idx, _ = day_schedule.get_slot_range(_date, wt_begin, wt_end)
+        workmen = self.get_workmen(work_regime, kwargs.get('workman_ids'))
+
+        for workman in workmen:
+            bitmap = None
+            if self.occupancy_index is not None:
+                bitmap = self.occupancy_index.get_bitmap(workman.id, work_regime, _date)
 
-        for workman in workman_qs:
-            res += self._process_workman_day(qs, _date, wrd, workman, **kwargs)
+            yield from self._process_workman_day(slots, workman, day_schedule.appointment_duration,
+                                                 bitmap, first_idx)
 
-        return res
+    def iter_days(self) -> Iterator[Tuple[dt.date, Optional[dt.datetime], Optional[dt.datetime]]]:
+        yield self.date, None, None
+
+    def _process_days(self, qs: QuerySet, work_regime: QuerySet,
+                      days: Iterable[Tuple[dt.date, Optional[dt.datetime], Optional[dt.datetime]]],
+                      **kwargs) -> Iterator[AppointmentInfo]:
+        for _date, wt_begin, wt_end in days:
+            yield from self._process_day(qs, work_regime, date=_date, wt_begin=wt_begin, wt_end=wt_end, **kwargs)
 
     def _process(self, *args, **kwargs):
         return self._process_day(*args, **kwargs)
@@ -183,24 +338,23 @@ class BaseDateRangeProcessor(BaseDateProcessor):
 
     @property
     def date_qs(self):
+        # appointments beginning before datetime_begin still might overlap the first slots
         return {
             "date__gte": self.datetime_begin.date(),
             "date__lte": self.datetime_end.date(),
+            "time__lt": self.datetime_end,
         }
 
-    def _process_date_range(self, qs: QuerySet, work_regime: QuerySet, **kwargs) -> List[AppointmentInfo]:
-        res = []
-        kwargs['wt_begin'] = self.datetime_begin
-        kwargs['wt_end'] = self.datetime_end
-
+    def iter_days(self) -> Iterator[Tuple[dt.date, Optional[dt.datetime], Optional[dt.datetime]]]:
         start_date = self.datetime_begin.date()
         end_date = self.datetime_end.date()
         day_count = (end_date - start_date).days + 1
 
         for _date in (start_date + dt.timedelta(n) for n in range(day_count)):
-            res += self._process_day(qs, work_regime, date=_date, **kwargs)
+            yield _date, self.datetime_begin, self.datetime_end
 
-        return res
+    def _process_date_range(self, qs: QuerySet, work_regime: QuerySet, **kwargs) -> Iterator[AppointmentInfo]:
+        return self._process_days(qs, work_regime, self.iter_days(), **kwargs)
 
     def _process(self, *args, **kwargs):
         return self._process_date_range(*args, **kwargs)
@@ -214,12 +368,18 @@ class SimpleDateProcessor:
             **self.date_qs
         )
 
-    def process_qs(self, qs: QuerySet) -> List[AppointmentInfo]:
-        res = []
+    def iter_targets(self) -> Iterator[Tuple[WorkRegime, Optional[List[int]]]]:
         for work_regime in WorkRegime.objects.all():
-            res += self._process(qs, work_regime)
+            yield work_regime, None
+
+    def process_qs(self, qs: QuerySet) -> Iterator[AppointmentInfo]:
+        # regimes are independent here, so they could be processed by the configured executor
+        from core.logic.parallel import get_executor, process_in_parallel
 
-        return res
+        _, executor = get_executor()
+        if executor is None:
+            return super().process_qs(qs)
+        return process_in_parallel(self, qs)
 
 
 class DateProcessor(SimpleDateProcessor, BaseDateProcessor):
@@ -233,11 +393,9 @@ class DateRangeProcessor(SimpleDateProcessor, BaseDateRangeProcessor):
 # Shop
 
 class ShopProcessor:
-    @property
+    @cached_property
     def work_regime(self):
-        return RepairShop.objects.get(
-            id=self.filter_args["repair_shop_id"]
-        ).default_work_regime
+        return get_repair_shop(self.filter_args["repair_shop_id"]).default_work_regime
 
     def filter_qs(self, qs: QuerySet) -> QuerySet:
         return qs.filter(
@@ -246,12 +404,14 @@ class ShopProcessor:
             **self.date_qs
         )
 
-    def process_qs(self, qs: QuerySet) -> List[AppointmentInfo]:
-        workman_ids = [
+    @cached_property
+    def workman_ids(self) -> List[int]:
+        return [
             w.id for w in Workman.objects.filter(repair_shop_id=self.filter_args["repair_shop_id"])
         ]
-        res = self._process(qs, self.work_regime, workman_ids=workman_ids)
-        return res
+
+    def iter_targets(self) -> Iterator[Tuple[WorkRegime, Optional[List[int]]]]:
+        yield self.work_regime, self.workman_ids
 
 
 class DateShopProcessor(ShopProcessor, BaseDateProcessor):
@@ -265,10 +425,9 @@ class DateRangeShopProcessor(ShopProcessor, BaseDateRangeProcessor):
 # Workman
 
 class WorkmanProcessor:
-    @property
+    @cached_property
     def work_regime(self):
-        workmam = Workman.objects.get(id=self.filter_args["workman_id"])
-        return workmam.individual_work_regime or workmam.repair_shop.default_work_regime
+        return get_workman_work_regime(self.filter_args["workman_id"])
 
     def filter_qs(self, qs: QuerySet) -> QuerySet:
         return qs.filter(
@@ -277,10 +436,9 @@ class WorkmanProcessor:
             **self.date_qs
         )
 
-    def process_qs(self, qs: QuerySet) -> List[AppointmentInfo]:
+    def iter_targets(self) -> Iterator[Tuple[WorkRegime, Optional[List[int]]]]:
         workman_ids = [self.filter_args["workman_id"]]
-        res = self._process(qs, self.work_regime, workman_ids=workman_ids)
-        return res
+        yield self.work_regime, workman_ids
 
 
 class DateWorkmanProcessor(WorkmanProcessor, BaseDateProcessor):
@@ -291,6 +449,17 @@ class DateRangeWorkmanProcessor(WorkmanProcessor, BaseDateRangeProcessor):
     pass
 
 
+# (period, target) signature of the passed args -> processor
+PROCESSORS = MappingProxyType({
+    ("date", None): DateProcessor,
+    ("date", "repair_shop_id"): DateShopProcessor,
+    ("date", "workman_id"): DateWorkmanProcessor,
+    ("range", None): DateRangeProcessor,
+    ("range", "repair_shop_id"): DateRangeShopProcessor,
+    ("range", "workman_id"): DateRangeWorkmanProcessor,
+})
+
+
 @dataclass
 class ProcessorArgs:
     date: dt.date = None
@@ -300,55 +469,46 @@ class ProcessorArgs:
     workman_id: int = None
     from_archive: bool = False
 
-    @classmethod
-    def proc_item(cls, key, val) -> dict:
-        if key == 'date':
-            if type(val) == str:
-                val = string_to_date(val)
-            if type(val) == dt.datetime:
-                val = val.date()
-
-        if key in ('datetime_begin', 'datetime_end'):
-            if type(val) == str:
-                val = string_to_date(val)
-
-        if key in ('repair_shop_id', 'workman_id'):
-            if type(val) == str:
-                val = int(val)
-
-        return val
-
     @classmethod
     def from_dict(cls, env: dict):
-        return cls(**{
-            k: cls.proc_item(k, v) for k, v in env.items()
-            if k in inspect.signature(cls).parameters
-        })
+        return cls(**_processor_args_binder.bind(env))
 
     @property
-    def processor(self):
+    def signature(self) -> tuple:
         if self.date is not None:
-            if self.workman_id is not None:
-                return DateWorkmanProcessor
-
-            if self.repair_shop_id is not None:
-                return DateShopProcessor
+            period = "date"
+        elif self.datetime_begin is not None and self.datetime_end is not None:
+            period = "range"
+        else:
+            period = None
 
-            return DateProcessor
+        if self.workman_id is not None:
+            target = "workman_id"
+        elif self.repair_shop_id is not None:
+            target = "repair_shop_id"
+        else:
+            target = None
 
-        if self.datetime_begin is not None and self.datetime_end is not None:
-            if self.workman_id is not None:
-                return DateRangeWorkmanProcessor
+        return period, target
 
-            if self.repair_shop_id is not None:
-                return DateRangeShopProcessor
+    @property
+    def processor(self):
+        try:
+            return PROCESSORS[self.signature]
+        except KeyError:
+            raise ProcessorNotFound
 
-            return DateRangeProcessor
+    def get_processor(self):
+        return self.processor(**_processor_args_binder.as_kwargs(self))
 
-        raise ProcessorNotFound
 
-    def get_processor(self):
-        return self.processor(**asdict(self))
+_processor_args_binder = ArgsBinder(ProcessorArgs, {
+    "date": to_date,
+    "datetime_begin": to_datetime,
+    "datetime_end": to_datetime,
+    "repair_shop_id": to_int,
+    "workman_id": to_int,
+})
 
 
 def get_data_processor__old(kw):
@@ -378,44 +538,94 @@ def get_data_processor__old(kw):
 
 
 class AppointmentTotalInfo(object):
+    SCOPE_CACHE_NAME = "appointments_info"
 
     def __init__(self, *args, **kw):
         """
             data processor depends on passed args:
-            "date":                                                 DateProcessor (Not implemented)
-            "datetime_begin" and "datetime_end":                    DateRangeProcessor (Not implemented)
+            "date":                                                 DateProcessor
+            "datetime_begin" and "datetime_end":                    DateRangeProcessor
             "date" and "repair_shop_id":                            DateShopProcessor
-            "datetime_begin", "datetime_end" and "repair_shop_id":  DateRangeShopProcessor (Not implemented)
-            "date" and "workman_id":                                DateWorkmanProcessor (Not implemented)
-            "datetime_begin", "datetime_end" and "workman_id":      DateRangeWorkmanProcessor (Not implemented)
+            "datetime_begin", "datetime_end" and "repair_shop_id":  DateRangeShopProcessor
+            "date" and "workman_id":                                DateWorkmanProcessor
+            "datetime_begin", "datetime_end" and "workman_id":      DateRangeWorkmanProcessor
+
+            counts_only: keep only amounts of slots, not the slots themselves
         """
 
         super().__init__()
+        self.counts_only = kw.pop("counts_only", False)
         proc_dataclass = ProcessorArgs.from_dict(kw)
         self.data_processor = proc_dataclass.get_processor()
-        self.appointments = []
+        self.appointments = AppointmentInfoList()
+        self.total_cnt = 0
+        self.occupied_cnt = 0
         self.collect_data()
 
+    @classmethod
+    def get(cls, **kw) -> "AppointmentTotalInfo":
+        """
+            Same as AppointmentTotalInfo(**kw), but reuses the result within the current request scope
+        """
+        memo = get_scope_cache(cls.SCOPE_CACHE_NAME)
+        if memo is None:
+            return cls(**kw)
+
+        key = (astuple(ProcessorArgs.from_dict(kw)), kw.get("counts_only", False))
+        if key not in memo:
+            memo[key] = cls(**kw)
+        return memo[key]
+
+    @classmethod
+    def clear_scope_cache(cls):
+        clear_scope_cache(cls.SCOPE_CACHE_NAME)
+
     def collect_data(self):
-        self.appointments = self.data_processor.collect_appointments()
+        # slots are stored once, free and occupied ones are picked from the occupancy bitfield on demand
+        for apnt in self.data_processor.iter_appointments():
+            self.total_cnt += 1
+            self.occupied_cnt += apnt.is_occupied
+
+            if not self.counts_only:
+                self.appointments.append(apnt)
+
+    @property
+    def available_cnt(self) -> int:
+        return self.total_cnt - self.occupied_cnt
 
     def get_all_appointments(self):
         return self.appointments
 
+    @cached_property
+    def available_appointments(self) -> AppointmentInfoSelection:
+        return self.appointments.select(is_occupied=False)
+
+    @cached_property
+    def occupied_appointments(self) -> AppointmentInfoSelection:
+        return self.appointments.select(is_occupied=True)
+
     def get_available_appointments(self):
-        return [apnt for apnt in self.appointments if not apnt.is_occupied]
+        return self.available_appointments
 
     def get_occupied_appointments(self):
-        return [apnt for apnt in self.appointments if apnt.is_occupied]
+        return self.occupied_appointments
 
 
 def get_all_appointments(**args):
-    return AppointmentTotalInfo(**args).get_all_appointments()
+    return AppointmentTotalInfo.get(**args).get_all_appointments()
 
 
 def get_available_appointments(**args):
-    return AppointmentTotalInfo(**args).get_available_appointments()
+    return AppointmentTotalInfo.get(**args).get_available_appointments()
 
 
 def get_occupied_appointments(**args):
-    return AppointmentTotalInfo(**args).get_occupied_appointments()
+    return AppointmentTotalInfo.get(**args).get_occupied_appointments()
+
+
+def iter_appointments(**args) -> Iterator[AppointmentInfo]:
+    return ProcessorArgs.from_dict(args).get_processor().iter_appointments()
+
+
+def iter_available_appointments(**args) -> Iterator[AppointmentInfo]:
+    return ProcessorArgs.from_dict(args).get_processor().iter_available_appointments()
@@ -0,0 +1,134 @@
+import operator
+from dataclasses import dataclass, field
+from functools import reduce
+from typing import Any, Dict, List, Optional
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+
+from core.logic.appointments_info import (WORKMEN_SCOPE_CACHE_NAME,
+                                          BaseDataProcessor, ProcessorArgs,
+                                          get_workmen_key)
+from core.logic.custom_exceptions import (ProcessorNotFound,
+                                          WrongArgumentsHasBeenPassed)
+from core.logic.interval_index import WorkmenIntervals
+from core.logic.request_scope import get_scope_cache, request_scope
+from core.logic.schedule import WorkRegimeSchedule
+from core.logic.workload import WorkloadEngine
+from core.models.staff import Workman
+
+KIND_AVAILABLE_TIME = "available_time"
+KIND_WORKLOAD = "workload"
+
+KINDS = (KIND_AVAILABLE_TIME, KIND_WORKLOAD)
+
+
+@dataclass
+class BatchItem:
+    kind: str
+    args: dict
+    processor: Optional[BaseDataProcessor] = None
+    targets: list = field(default_factory=list)
+    result: Any = None
+    error: Optional[Exception] = None
+
+
+class BatchQuery(object):
+    """
+        Runs several available time / workload queries at once:
+        work regime details, workmen and appointments of the union of targets
+        are fetched with one query each and shared by all processors.
+    """
+
+    def __init__(self, specs: List[Dict[str, Any]]):
+        super().__init__()
+        self.items = [self._make_item(spec) for spec in specs]
+
+    @staticmethod
+    def _make_item(spec: dict) -> BatchItem:
+        spec = dict(spec)
+        item = BatchItem(kind=spec.pop("kind", KIND_AVAILABLE_TIME), args=spec)
+        if item.kind not in KINDS:
+            item.error = WrongArgumentsHasBeenPassed(item.kind)
+            return item
+
+        try:
+            item.processor = ProcessorArgs.from_dict(item.args).get_processor()
+            item.targets = [target for target in item.processor.iter_targets() if target[0] is not None]
+        except (ProcessorNotFound, WrongArgumentsHasBeenPassed, ObjectDoesNotExist) as e:
+            item.error = e
+        return item
+
+    @property
+    def _valid_items(self) -> List[BatchItem]:
+        return [item for item in self.items if item.error is None]
+
+    def _prefetch_schedules(self):
+        WorkRegimeSchedule.prefetch({
+            work_regime.id for item in self._valid_items for work_regime, _ in item.targets
+        })
+
+    def _prefetch_workmen(self):
+        cache = get_scope_cache(WORKMEN_SCOPE_CACHE_NAME)
+        keys = {
+            get_workmen_key(work_regime.id, workman_ids): work_regime
+            for item in self._valid_items for work_regime, workman_ids in item.targets
+        }
+        keys = {key: work_regime for key, work_regime in keys.items() if key not in cache}
+        if not keys:
+            return
+
+        conditions = []
+        for (work_regime_id, workman_ids), work_regime in keys.items():
+            if workman_ids:
+                conditions.append(Q(id__in=workman_ids))
+            else:
+                conditions.append(
+                    (Q(repair_shop__default_work_regime_id=work_regime_id) | Q(individual_work_regime_id=work_regime_id))
+                    & Q(repair_shop_id=work_regime.repair_shop_id)
+                )
+
+        # a single query in the model ordering, so every subset keeps the order of get_workman_qs
+        workmen = list(Workman.objects.filter(reduce(operator.or_, conditions)).select_related("repair_shop"))
+
+        for key, work_regime in keys.items():
+            work_regime_id, workman_ids = key
+            if workman_ids:
+                cache[key] = [w for w in workmen if w.id in workman_ids]
+            else:
+                cache[key] = [
+                    w for w in workmen
+                    if w.repair_shop_id == work_regime.repair_shop_id
+                    and work_regime_id in (w.repair_shop.default_work_regime_id, w.individual_work_regime_id)
+                ]
+
+    def _prefetch_occupied(self) -> Dict[bool, WorkmenIntervals]:
+        querysets = {}
+        for item in self._valid_items:
+            processor = item.processor
+            qs = processor.filter_qs(processor.get_qs())
+            from_archive = processor.from_archive
+            querysets[from_archive] = querysets[from_archive] | qs if from_archive in querysets else qs
+
+        return {from_archive: WorkmenIntervals.from_qs(qs) for from_archive, qs in querysets.items()}
+
+    def _run_item(self, item: BatchItem, occupied: WorkmenIntervals):
+        if item.kind == KIND_WORKLOAD:
+            item.result = WorkloadEngine(item.processor, occupied).get_workload()
+        else:
+            item.result = list(item.processor.iter_available_appointments(occupied))
+
+    def run(self) -> List[BatchItem]:
+        with request_scope():
+            self._prefetch_schedules()
+            self._prefetch_workmen()
+            occupied = self._prefetch_occupied()
+
+            for item in self._valid_items:
+                self._run_item(item, occupied[item.processor.from_archive])
+
+        return self.items
+
+
+def run_batch(specs: List[Dict[str, Any]]) -> List[BatchItem]:
+    return BatchQuery(specs).run()
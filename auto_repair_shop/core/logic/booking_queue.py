@@ -0,0 +1,121 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from core.logic.occupancy_index import get_occupancy_index
+
+Command = Tuple[Callable[..., Any], tuple, Future]
+
+
+class BookingWriter(object):
+    """
+        Single writer of the booking commands of the process: callers put commands on a queue
+        and wait for their futures, a daemon thread applies them in batches, a transaction per batch
+        (a savepoint per command), so SQLite sees a single writer instead of competing file locks.
+    """
+
+    def __init__(self, batch_size: int = 64):
+        super().__init__()
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Optional[Command]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="booking-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def is_writer_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, func: Callable[..., Any], *args) -> Future:
+        future = Future()
+        self._queue.put((func, args, future))
+        return future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self) -> Optional[List[Command]]:
+        command = self._queue.get()
+        if command is None:
+            return None
+
+        batch = [command]
+        while len(batch) < self.batch_size:
+            try:
+                command = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if command is None:
+                self._queue.put(None)
+                break
+            batch.append(command)
+        return batch
+
+    @staticmethod
+    def _apply(batch: List[Command]) -> list:
+        results = []
+        with transaction.atomic():
+            for func, args, _ in batch:
+                try:
+                    with transaction.atomic():
+                        results.append((True, func(*args)))
+                except Exception as e:
+                    results.append((False, e))
+        return results
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+
+            close_old_connections()
+            try:
+                results = self._apply(batch)
+            except Exception as e:
+                # the batch has been rolled back, bitmaps might have been marked by its commands
+                occupancy_index = get_occupancy_index()
+                if occupancy_index is not None:
+                    occupancy_index.clear()
+                results = [(False, e)] * len(batch)
+
+            for (_, _, future), (is_done, value) in zip(batch, results):
+                if is_done:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+        close_old_connections()
+
+
+_writer: Optional[BookingWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_booking_writer() -> Optional[BookingWriter]:
+    """
+        The writer is opt-in (BOOKING_QUEUE setting), it coordinates the writes of one process only:
+        several worker processes still need a single worker or a database handling concurrent writers.
+    """
+    global _writer
+
+    if not getattr(settings, "BOOKING_QUEUE", False):
+        return None
+
+    with _writer_lock:
+        if _writer is None:
+            _writer = BookingWriter(getattr(settings, "BOOKING_QUEUE_BATCH_SIZE", 64))
+        return _writer
+
+
+def stop_booking_writer():
+    global _writer
+
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
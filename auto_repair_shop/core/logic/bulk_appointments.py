@@ -0,0 +1,313 @@
+import datetime as dt
+import operator
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import reduce
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from core.logic.appointments_actions import (AppointmentArgs, is_on_schedule,
+                                             lock_workmen, mark_booking,
+                                             run_booking)
+from core.logic.appointments_info import AppointmentTotalInfo
+from core.logic.custom_exceptions import WrongArgumentsHasBeenPassed
+from core.logic.interval_index import WorkmenIntervals
+from core.logic.schedule import WorkRegimeSchedule
+from core.models.staff import Workman
+from core.models.workflow import Appointments
+from core.utils.dateutils import get_timezone_offsets
+
+ACTION_CREATE = "create"
+ACTION_MOVE = "move"
+ACTION_DELETE = "delete"
+
+
+@dataclass
+class BulkItem:
+    args: Optional[AppointmentArgs]
+    is_error: bool = False
+    msg: Any = None
+    record: Optional[Appointments] = None
+
+    def fail(self, msg):
+        self.is_error, self.msg = True, msg
+
+    @property
+    def result(self) -> Tuple[bool, Any]:
+        return self.is_error, self.msg if self.is_error else _("Success")
+
+
+class BookingSnapshot(object):
+    """
+        Appointments of the batch workmen read once, plus the intervals taken by the batch itself.
+        Pending intervals are tagged by record id, so a moved appointment doesn't collide with its old time.
+    """
+
+    def __init__(self, committed: WorkmenIntervals):
+        super().__init__()
+        self.committed = committed
+        self.pending: Dict[int, List[Tuple[Optional[int], dt.datetime, dt.datetime]]] = defaultdict(list)
+
+    def overlaps(self, workman_id: int, begin: dt.datetime, end: dt.datetime, record_id: int = None) -> bool:
+        if self.committed.overlaps(workman_id, begin, end):
+            return True
+        return any(
+            tag != record_id or tag is None
+            for tag, p_begin, p_end in self.pending[workman_id] if p_begin < end and p_end > begin
+        )
+
+    def take(self, workman_id: int, begin: dt.datetime, end: dt.datetime, record_id: int = None):
+        if record_id is not None:
+            self.release(workman_id, record_id)
+        self.pending[workman_id].append((record_id, begin, end))
+
+    def release(self, workman_id: int, record_id: int):
+        self.pending[workman_id] = [p for p in self.pending[workman_id] if p[0] != record_id]
+
+
+class BulkAppointmentsCommunicator(object):
+    """
+        Bulk variant of AppointmentsModelCommunicator: the batch is validated against a single
+        snapshot of schedules and appointments (a query per model), valid items are written
+        with bulk_create/bulk_update in one transaction, results are returned per item.
+    """
+
+    def __init__(self, items: List[dict], user_id: int = None):
+        super().__init__()
+        self.items = [self._make_item(spec, user_id) for spec in items]
+
+    @staticmethod
+    def _make_item(spec: dict, user_id: int = None) -> BulkItem:
+        if user_id is not None:
+            spec = {**spec, "user_id": user_id}
+
+        try:
+            item = BulkItem(AppointmentArgs.from_dict(spec))
+        except WrongArgumentsHasBeenPassed:
+            item = BulkItem(None)
+
+        if item.args is None or item.args.workman_id is None or not isinstance(item.args.time, dt.datetime):
+            item.fail(_("Wrong arguments"))
+        return item
+
+    @property
+    def _valid_items(self) -> List[BulkItem]:
+        return [item for item in self.items if not item.is_error]
+
+    @staticmethod
+    def _get_workmen(workman_ids) -> Dict[int, Tuple[Optional[WorkRegimeSchedule], Optional[int]]]:
+        """
+            workman_id -> (schedule the slots are generated by, id of its regime)
+        """
+        rows = list(Workman.objects.filter(id__in=workman_ids).values_list(
+            "id", "individual_work_regime_id", "repair_shop__default_work_regime_id"
+        ))
+        WorkRegimeSchedule.prefetch({row[1] or row[2] for row in rows} - {None})
+
+        res = {}
+        for workman_id, individual_id, default_id in rows:
+            work_regime_id = individual_id or default_id
+            schedule = WorkRegimeSchedule.get_by_id(work_regime_id) if work_regime_id is not None else None
+            res[workman_id] = (schedule, work_regime_id)
+        return res
+
+    @staticmethod
+    def _get_snapshot(workman_ids, times: List[dt.datetime], exclude_ids=()) -> BookingSnapshot:
+        # appointments never last longer than a work day
+        qs = Appointments.objects.filter(
+            workman_id__in=workman_ids,
+            time__gt=min(times) - dt.timedelta(days=1),
+            time__lt=max(times) + dt.timedelta(days=1),
+        ).exclude(id__in=list(exclude_ids))
+        return BookingSnapshot(WorkmenIntervals.from_qs(qs))
+
+    def _get_records(self) -> Dict[tuple, Appointments]:
+        items = self._valid_items
+        if not items:
+            return {}
+
+        conditions = [
+            Q(customer_id=item.args.user_id, workman_id=item.args.workman_id, time=item.args.time) for item in items
+        ]
+        return {
+            (record.customer_id, record.workman_id, record.time): record
+            for record in Appointments.objects.filter(reduce(operator.or_, conditions))
+        }
+
+    def _bind_records(self):
+        records = self._get_records()
+        for item in self._valid_items:
+            key = (item.args.user_id, item.args.workman_id, item.args.time)
+            # an appointment is moved or deleted by a single item of the batch
+            item.record = records.pop(key, None)
+            if item.record is None:
+                item.fail(_("Appointment not found"))
+
+    @staticmethod
+    def _check(item: BulkItem, workmen: dict, snapshot: BookingSnapshot,
+               _time: dt.datetime, duration: Optional[int], record_id: int = None) -> Optional[int]:
+        """
+            Returns the duration of the valid appointment, None (and the item error) otherwise.
+        """
+        schedule = workmen.get(item.args.workman_id, (None, None))[0]
+        if schedule is None:
+            item.fail(_("Chosen time is not valid"))
+            return None
+
+        if duration is None:
+            day_schedule = schedule.get_day(get_timezone_offsets().to_local(_time).date())
+            duration = day_schedule.appointment_duration if day_schedule is not None else 0
+
+        end = _time + dt.timedelta(seconds=duration)
+        if snapshot.overlaps(item.args.workman_id, _time, end, record_id):
+            item.fail(_("Chosen time is not available"))
+            return None
+
+        if not is_on_schedule(schedule, _time, duration):
+            item.fail(_("Chosen time is not valid"))
+            return None
+
+        snapshot.take(item.args.workman_id, _time, end, record_id)
+        return duration
+
+    @staticmethod
+    def _save(items: List[BulkItem], save_all, save_one):
+        """
+            Writes the items at once; when a concurrent booking violates the constraint,
+            falls back to a savepoint per item to find the conflicting ones.
+        """
+        if not items:
+            return
+
+        try:
+            with transaction.atomic():
+                save_all([item.record for item in items])
+        except IntegrityError:
+            for item in items:
+                try:
+                    with transaction.atomic():
+                        save_one(item.record)
+                except IntegrityError:
+                    item.fail(_("Chosen time is not available"))
+
+    def create(self) -> List[Tuple[bool, Any]]:
+        items = self._valid_items
+        if items:
+            workman_ids = {item.args.workman_id for item in items}
+            with transaction.atomic():
+                lock_workmen(workman_ids)
+                workmen = self._get_workmen(workman_ids)
+                snapshot = self._get_snapshot(workman_ids, [item.args.time for item in items])
+
+                for item in items:
+                    duration = self._check(item, workmen, snapshot, item.args.time, item.args.duration)
+                    if duration is None:
+                        continue
+
+                    item.record = Appointments(
+                        customer_id=item.args.user_id,
+                        workman_id=item.args.workman_id,
+                        date=item.args.time.date(),
+                        time=item.args.time,
+                        work_regime_id=workmen[item.args.workman_id][1],
+                        duration=duration,
+                    )
+
+                self._save(
+                    self._valid_items,
+                    lambda records: Appointments.objects.bulk_create(records),
+                    lambda record: record.save(),
+                )
+
+            for item in self._valid_items:
+                mark_booking(item.record.workman_id, item.record.time, item.record.duration, is_occupied=True)
+            AppointmentTotalInfo.clear_scope_cache()
+
+        return [item.result for item in self.items]
+
+    def move(self) -> List[Tuple[bool, Any]]:
+        for item in self._valid_items:
+            if not isinstance(item.args.new_time, dt.datetime):
+                item.fail(_("Wrong arguments"))
+
+        if self._valid_items:
+            workman_ids = {item.args.workman_id for item in self._valid_items}
+            moved = []
+            with transaction.atomic():
+                lock_workmen(workman_ids)
+                self._bind_records()
+                items = self._valid_items
+
+                records = [item.record for item in items]
+                workmen = self._get_workmen(workman_ids)
+                snapshot = self._get_snapshot(
+                    workman_ids,
+                    [item.args.time for item in items] + [item.args.new_time for item in items],
+                    exclude_ids=[record.id for record in records],
+                )
+                # an appointment keeps its old time until its own item is checked
+                for record in records:
+                    snapshot.take(record.workman_id, record.time,
+                                  record.time + dt.timedelta(seconds=record.duration), record.id)
+
+                for item in items:
+                    record = item.record
+                    if self._check(item, workmen, snapshot, item.args.new_time, record.duration, record.id) is None:
+                        continue
+
+                    moved.append((record.time, item))
+                    record.date = item.args.new_time.date()
+                    record.time = item.args.new_time
+
+                self._save(
+                    self._valid_items,
+                    lambda records: Appointments.objects.bulk_update(records, ["date", "time"]),
+                    lambda record: record.save(update_fields=["date", "time"]),
+                )
+
+            for old_time, item in moved:
+                if not item.is_error:
+                    mark_booking(item.record.workman_id, old_time, item.record.duration, is_occupied=False)
+                    mark_booking(item.record.workman_id, item.record.time, item.record.duration, is_occupied=True)
+            AppointmentTotalInfo.clear_scope_cache()
+
+        return [item.result for item in self.items]
+
+    def delete(self) -> List[Tuple[bool, Any]]:
+        if self._valid_items:
+            with transaction.atomic():
+                lock_workmen({item.args.workman_id for item in self._valid_items})
+                self._bind_records()
+                Appointments.objects.filter(id__in=[item.record.id for item in self._valid_items]).delete()
+
+            for item in self._valid_items:
+                mark_booking(item.record.workman_id, item.record.time, item.record.duration, is_occupied=False)
+            AppointmentTotalInfo.clear_scope_cache()
+
+        return [item.result for item in self.items]
+
+
+def _apply_bulk(action: str, items: List[dict], user_id: int = None) -> List[Tuple[bool, Any]]:
+    return getattr(BulkAppointmentsCommunicator(items, user_id), action)()
+
+
+def make_appointments(items: List[dict], user_id: int = None) -> List[Tuple[bool, Any]]:
+    return run_booking(_apply_bulk, ACTION_CREATE, items, user_id)
+
+
+def move_appointments(items: List[dict], user_id: int = None) -> List[Tuple[bool, Any]]:
+    return run_booking(_apply_bulk, ACTION_MOVE, items, user_id)
+
+
+def delete_appointments(items: List[dict], user_id: int = None) -> List[Tuple[bool, Any]]:
+    return run_booking(_apply_bulk, ACTION_DELETE, items, user_id)
+
+
+BULK_ACTIONS = {
+    ACTION_CREATE: make_appointments,
+    ACTION_MOVE: move_appointments,
+    ACTION_DELETE: delete_appointments,
+}
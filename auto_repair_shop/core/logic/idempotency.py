@@ -0,0 +1,139 @@
+import datetime as dt
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from core.models.workflow import IdempotencyKey
+from core.utils.message_formers import form_error
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+
+def get_ttl() -> dt.timedelta:
+    return dt.timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+
+def get_pending_timeout() -> dt.timedelta:
+    return dt.timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_PENDING_TIMEOUT", 60))
+
+
+def get_request_hash(data: dict) -> str:
+    dump = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(dump.encode()).hexdigest()
+
+
+def purge_expired() -> int:
+    deleted, _ = IdempotencyKey.objects.filter(created__lt=timezone.now() - get_ttl()).delete()
+    return deleted
+
+
+_last_purge: Optional[float] = None
+_purge_lock = threading.Lock()
+
+
+def purge_expired_throttled() -> int:
+    """
+        Purges at most once per IDEMPOTENCY_KEY_PURGE_INTERVAL seconds per process,
+        0 leaves the purge to "manage.py purge_idempotency_keys".
+    """
+    global _last_purge
+
+    interval = getattr(settings, "IDEMPOTENCY_KEY_PURGE_INTERVAL", 60 * 60)
+    if not interval:
+        return 0
+
+    now = time.monotonic()
+    with _purge_lock:
+        if _last_purge is not None and now - _last_purge < interval:
+            return 0
+        _last_purge = now
+    return purge_expired()
+
+
+def evict_oldest(customer_id: int) -> int:
+    """
+        Keeps at most IDEMPOTENCY_KEY_MAX_PER_CUSTOMER keys of the customer, the oldest ones are deleted.
+    """
+    max_keys = getattr(settings, "IDEMPOTENCY_KEY_MAX_PER_CUSTOMER", 1000)
+    ids = list(IdempotencyKey.objects.filter(customer_id=customer_id)
+               .order_by("-created", "-id").values_list("id", flat=True)[max_keys:])
+    if not ids:
+        return 0
+
+    deleted, _ = IdempotencyKey.objects.filter(id__in=ids).delete()
+    return deleted
+
+
+def _is_stale(record: IdempotencyKey) -> bool:
+    now = timezone.now()
+    if record.created < now - get_ttl():
+        return True
+    # the request which claimed the key died (or failed to store its response), so retries are not blocked
+    return record.response is None and record.created < now - get_pending_timeout()
+
+
+def _claim(customer_id: int, endpoint: str, key: str, request_hash: str):
+    """
+        Returns (record, None) when the key is claimed by this request,
+        (None, stored record) when it has been claimed before.
+    """
+    lookup = {"customer_id": customer_id, "endpoint": endpoint, "key": key}
+
+    # an expired or stale record might not have been purged yet, the claim is retried once after deleting it
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(request_hash=request_hash, **lookup), None
+        except IntegrityError:
+            stored = IdempotencyKey.objects.filter(**lookup).first()
+            if attempt or stored is None or not _is_stale(stored):
+                return None, stored
+            IdempotencyKey.objects.filter(id=stored.id).delete()
+
+    return None, None
+
+
+def run_idempotent(customer_id: int, endpoint: str, key: str, data: dict, func: Callable[[], dict]) -> dict:
+    """
+        Runs func once per (customer, endpoint, key) within the TTL and answers the replays
+        with the stored response. A key left without response for IDEMPOTENCY_KEY_PENDING_TIMEOUT
+        seconds can be claimed again. Requests without a key are just run.
+        The store is bounded per customer, expired keys are purged periodically.
+    """
+    if not key:
+        return func()
+
+    request_hash = get_request_hash(data)
+    purge_expired_throttled()
+
+    record, stored = _claim(customer_id, endpoint, key, request_hash)
+    if record is None:
+        if stored is not None and stored.request_hash != request_hash:
+            return form_error(_("Idempotency key has already been used with other arguments"))
+        if stored is None or stored.response is None:
+            # a concurrent retry has just claimed the key
+            return form_error(_("Request with this idempotency key is in progress"))
+        return stored.response
+
+    evict_oldest(customer_id)
+
+    try:
+        response = func()
+    except Exception:
+        # nothing is stored, so the client can retry
+        record.delete()
+        raise
+
+    # a no-op when the key has been reclaimed as stale meanwhile
+    IdempotencyKey.objects.filter(id=record.id).update(
+        response=json.loads(json.dumps(response, cls=DjangoJSONEncoder))
+    )
+    return response
@@ -0,0 +1,76 @@
+from typing import Callable, Optional, Type, TypeVar
+
+from django.db.models import Model
+
+from core.logic.request_scope import clear_scope_cache, get_scope_cache
+from core.models.repair_shop import RepairShop
+from core.models.staff import Workman
+from core.models.work_regime import WorkRegime
+
+IDENTITY_MAP_SCOPE_CACHE_NAME = "identity_map"
+
+M = TypeVar("M", bound=Model)
+
+
+def _register(instance: Optional[Model]):
+    cache = get_scope_cache(IDENTITY_MAP_SCOPE_CACHE_NAME)
+    if cache is not None and instance is not None:
+        cache.setdefault((type(instance), instance.pk), instance)
+
+
+def get_instance(model: Type[M], pk: int, load: Callable[[], M] = None) -> M:
+    """
+        A single instance per (model, pk) within the request scope, so the processors and
+        communicators of a request share the lookups. Outside of a scope every call loads the object.
+    """
+    cache = get_scope_cache(IDENTITY_MAP_SCOPE_CACHE_NAME)
+    key = (model, pk)
+    if cache is not None and key in cache:
+        return cache[key]
+
+    instance = load() if load is not None else model.objects.get(pk=pk)
+    if cache is not None:
+        cache[key] = instance
+    return instance
+
+
+def get_workman(workman_id: int) -> Workman:
+    """
+        The workman with his shop and work regimes, which are registered in the map as well.
+    """
+    def load():
+        workman = Workman.objects.select_related(
+            "repair_shop__default_work_regime", "individual_work_regime"
+        ).get(pk=workman_id)
+
+        _register(workman.repair_shop)
+        _register(workman.repair_shop.default_work_regime)
+        _register(workman.individual_work_regime)
+        return workman
+
+    return get_instance(Workman, workman_id, load)
+
+
+def get_repair_shop(repair_shop_id: int) -> RepairShop:
+    def load():
+        repair_shop = RepairShop.objects.select_related("default_work_regime").get(pk=repair_shop_id)
+        _register(repair_shop.default_work_regime)
+        return repair_shop
+
+    return get_instance(RepairShop, repair_shop_id, load)
+
+
+def get_work_regime(work_regime_id: int) -> WorkRegime:
+    return get_instance(WorkRegime, work_regime_id)
+
+
+def get_workman_work_regime(workman_id: int) -> Optional[WorkRegime]:
+    """
+        Regime the slots of the workman are generated by.
+    """
+    workman = get_workman(workman_id)
+    return workman.individual_work_regime or workman.repair_shop.default_work_regime
+
+
+def clear_identity_map():
+    clear_scope_cache(IDENTITY_MAP_SCOPE_CACHE_NAME)
@@ -0,0 +1,81 @@
+import bisect
+import datetime as dt
+from collections import defaultdict
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, Tuple
+
+from django.db.models import QuerySet
+
+
+class IntervalIndex(object):
+    """
+        Booked intervals [begin, end) of a single workman sorted by begin,
+        with prefix maximum of ends: "does [begin, end) overlap anything" is a single bisect.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[dt.datetime, int]] = ()):
+        super().__init__()
+        items = sorted((begin, begin + dt.timedelta(seconds=duration)) for begin, duration in intervals)
+        self.begins = [begin for begin, _ in items]
+        self.ends = [end for _, end in items]
+        self.max_ends = list(accumulate(self.ends, max))
+
+    def __len__(self):
+        return len(self.begins)
+
+    def __iter__(self) -> Iterator[Tuple[dt.datetime, dt.datetime]]:
+        return iter(zip(self.begins, self.ends))
+
+    def overlaps(self, begin: dt.datetime, end: dt.datetime) -> bool:
+        idx = bisect.bisect_left(self.begins, end)
+        return idx > 0 and self.max_ends[idx - 1] > begin
+
+    def iter_overlapping(self, begin: dt.datetime, end: dt.datetime) -> Iterator[Tuple[dt.datetime, dt.datetime]]:
+        """
+            Intervals overlapping [begin, end), found by bisect: every interval before
+            the first prefix maximum exceeding begin finishes before it.
+        """
+        lo = bisect.bisect_right(self.max_ends, begin)
+        hi = bisect.bisect_left(self.begins, end)
+        for idx in range(lo, hi):
+            if self.ends[idx] > begin:
+                yield self.begins[idx], self.ends[idx]
+
+
+class WorkmenIntervals(object):
+    """
+        IntervalIndex per workman built from (workman_id, time, duration) rows.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, dt.datetime, int]] = ()):
+        super().__init__()
+        grouped = defaultdict(list)
+        for workman_id, time, duration in rows:
+            grouped[workman_id].append((time, duration))
+
+        self.indexes: Dict[int, IntervalIndex] = {
+            workman_id: IntervalIndex(intervals) for workman_id, intervals in grouped.items()
+        }
+
+    @classmethod
+    def from_qs(cls, qs: QuerySet) -> "WorkmenIntervals":
+        return cls(qs.values_list("workman_id", "time", "duration"))
+
+    def __bool__(self):
+        return bool(self.indexes)
+
+    def overlaps(self, workman_id: int, begin: dt.datetime, end: dt.datetime) -> bool:
+        index = self.indexes.get(workman_id)
+        return index is not None and index.overlaps(begin, end)
+
+    def iter_intervals(self) -> Iterator[Tuple[int, dt.datetime, dt.datetime]]:
+        for workman_id, index in self.indexes.items():
+            for begin, end in index:
+                yield workman_id, begin, end
+
+    def subset(self, workman_ids: Iterable[int]) -> "WorkmenIntervals":
+        res = WorkmenIntervals()
+        res.indexes = {
+            workman_id: self.indexes[workman_id] for workman_id in workman_ids if workman_id in self.indexes
+        }
+        return res
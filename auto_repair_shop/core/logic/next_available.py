@@ -0,0 +1,105 @@
+import datetime as dt
+import heapq
+from itertools import islice
+from typing import Dict, Iterator, List
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.logic.appointments_info import (AppointmentInfo, BaseDataProcessor,
+                                          DateShopProcessor,
+                                          DateWorkmanProcessor)
+from core.logic.custom_exceptions import ProcessorNotFound
+from core.logic.interval_index import WorkmenIntervals
+from core.logic.schedule import WorkRegimeSchedule
+from core.models.workflow import Appointments
+from core.utils.dateutils import get_day_begin, get_timezone_offsets
+
+
+class ChunkedOccupancy(object):
+    """
+        Booked intervals of the workmen loaded lazily by chunks of days,
+        so a search that stops early reads only the days it has walked.
+    """
+
+    def __init__(self, workman_ids: List[int], first_date: dt.date, chunk_days: int = 7):
+        super().__init__()
+        self.workman_ids = workman_ids
+        self.first_date = first_date
+        self.chunk_days = chunk_days
+        self._chunks: Dict[int, WorkmenIntervals] = {}
+
+    def _load(self, chunk_idx: int) -> WorkmenIntervals:
+        date_begin = self.first_date + dt.timedelta(days=chunk_idx * self.chunk_days)
+        date_end = date_begin + dt.timedelta(days=self.chunk_days)
+
+        # margins keep shifts finishing on the next day and long appointments of the previous one
+        return WorkmenIntervals.from_qs(Appointments.objects.filter(
+            workman_id__in=self.workman_ids,
+            time__gt=get_day_begin(date_begin - dt.timedelta(days=1)),
+            time__lt=get_day_begin(date_end + dt.timedelta(days=1)),
+        ))
+
+    def overlaps(self, workman_id: int, _date: dt.date, begin: dt.datetime, end: dt.datetime) -> bool:
+        chunk_idx = (_date - self.first_date).days // self.chunk_days
+        if chunk_idx not in self._chunks:
+            self._chunks[chunk_idx] = self._load(chunk_idx)
+        return self._chunks[chunk_idx].overlaps(workman_id, begin, end)
+
+
+def _get_processor(repair_shop_id: int = None, workman_id: int = None) -> BaseDataProcessor:
+    if workman_id is not None:
+        return DateWorkmanProcessor(workman_id=workman_id)
+    if repair_shop_id is not None:
+        return DateShopProcessor(repair_shop_id=repair_shop_id)
+    raise ProcessorNotFound
+
+
+def _iter_workman_slots(schedule: WorkRegimeSchedule, workman_id: int, repair_shop_id: int,
+                        after: dt.datetime, occupancy: ChunkedOccupancy,
+                        max_days: int) -> Iterator[AppointmentInfo]:
+    for n in range(max_days):
+        _date = occupancy.first_date + dt.timedelta(days=n)
+        day_schedule = schedule.get_day(_date)
+        if day_schedule is None:
+            continue
+
+        for datetime_begin, datetime_end in day_schedule.project(_date, after):
+            if not occupancy.overlaps(workman_id, _date, datetime_begin, datetime_end):
+                yield AppointmentInfo(repair_shop_id, workman_id, datetime_begin, datetime_end,
+                                      day_schedule.appointment_duration, False)
+
+
+def iter_next_available(repair_shop_id: int = None, workman_id: int = None,
+                        after: dt.datetime = None, max_days: int = None) -> Iterator[AppointmentInfo]:
+    """
+        Free slots beginning at or after `after` in time order: every workman is a lazy stream
+        walking the days in order, streams are merged by a heap (k-way merge).
+    """
+    processor = _get_processor(repair_shop_id, workman_id)
+    after = after or timezone.now()
+    max_days = max_days or getattr(settings, "NEXT_AVAILABLE_MAX_DAYS", 366)
+
+    # the previous day is walked too, its shift might finish on the next day
+    first_date = get_timezone_offsets().to_local(after).date() - dt.timedelta(days=1)
+
+    streams = []
+    for work_regime, workman_ids in processor.iter_targets():
+        if work_regime is None:
+            continue
+
+        schedule = WorkRegimeSchedule.get(work_regime)
+        workmen = list(processor.get_workman_qs(work_regime, workman_ids).values_list("id", "repair_shop_id"))
+        occupancy = ChunkedOccupancy([w_id for w_id, _ in workmen], first_date)
+
+        streams.extend(
+            _iter_workman_slots(schedule, w_id, rs_id, after, occupancy, max_days + 1)
+            for w_id, rs_id in workmen
+        )
+
+    return heapq.merge(*streams, key=lambda apnt: (apnt.datetime_begin, apnt.workman_id))
+
+
+def find_next_available(repair_shop_id: int = None, workman_id: int = None,
+                        after: dt.datetime = None, limit: int = 1) -> List[AppointmentInfo]:
+    return list(islice(iter_next_available(repair_shop_id, workman_id, after), limit))
@@ -0,0 +1,139 @@
+import datetime as dt
+import threading
+from typing import Optional
+
+from django.conf import settings
+
+from core.logic.schedule import WorkRegimeSchedule
+from core.models.work_regime import WorkRegime
+from core.models.workflow import Appointments
+from core.utils.dateutils import get_timezone_offsets
+from core.utils.lru import LRUCache
+
+
+def popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+def range_mask(lo: int, hi: int) -> int:
+    return ((1 << (hi - lo)) - 1) << lo if hi > lo else 0
+
+
+class OccupancyIndex(object):
+    """
+        Bitmap of booked slots per (workman, work regime, date): bit i is set when slot i
+        of the compiled day schedule overlaps a booked interval.
+        Bitmaps are loaded lazily (one query per workman-day) and kept up to date by
+        core.logic.appointments_actions, so the index is valid within a single process only.
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        super().__init__()
+        self._bitmaps = LRUCache(maxsize)
+        self._lock = threading.RLock()
+
+    def _load(self, workman_id: int, work_regime: WorkRegime, _date: dt.date) -> int:
+        day_schedule = WorkRegimeSchedule.get(work_regime).get_day(_date)
+        if day_schedule is None:
+            return 0
+
+        work_time_begin, work_time_end = day_schedule.get_borders(_date)
+        # long appointments of the previous day might still overlap the first slots
+        rows = Appointments.objects.filter(
+            workman_id=workman_id,
+            time__gt=work_time_begin - dt.timedelta(days=1),
+            time__lt=work_time_end,
+        ).values_list("time", "duration")
+
+        bitmap = 0
+        for time, duration in rows:
+            end = time + dt.timedelta(seconds=duration)
+            bitmap |= range_mask(*day_schedule.get_overlapping_range(_date, time, end))
+        return bitmap
+
+    def get_bitmap(self, workman_id: int, work_regime: WorkRegime, _date: dt.date) -> int:
+        key = (workman_id, work_regime.id, _date)
+        with self._lock:
+            return self._bitmaps.get_or_set(key, lambda: self._load(workman_id, work_regime, _date))
+
+    def get_free_bitmap(self, workman_id: int, work_regime: WorkRegime, _date: dt.date,
+                        lo: int = 0, hi: int = None) -> int:
+        day_schedule = WorkRegimeSchedule.get(work_regime).get_day(_date)
+        if day_schedule is None:
+            return 0
+
+        hi = len(day_schedule.offsets) if hi is None else hi
+        return range_mask(lo, hi) & ~self.get_bitmap(workman_id, work_regime, _date)
+
+    def count_occupied(self, workman_id: int, work_regime: WorkRegime, _date: dt.date,
+                       lo: int, hi: int) -> int:
+        return popcount(self.get_bitmap(workman_id, work_regime, _date) & range_mask(lo, hi))
+
+    def is_occupied(self, workman_id: int, work_regime: WorkRegime, time: dt.datetime,
+                    duration: int = None) -> bool:
+        schedule = WorkRegimeSchedule.get(work_regime)
+        local_date = get_timezone_offsets().to_local(time).date()
+
+        # shift finishing on the next day belongs to the previous date
+        for _date in (local_date, local_date - dt.timedelta(days=1)):
+            day_schedule = schedule.get_day(_date)
+            idx = day_schedule.get_slot_index(_date, time) if day_schedule else None
+            if idx is None:
+                continue
+
+            mask = 1 << idx
+            if duration:
+                end = time + dt.timedelta(seconds=duration)
+                mask |= range_mask(*day_schedule.get_overlapping_range(_date, time, end))
+            return bool(self.get_bitmap(workman_id, work_regime, _date) & mask)
+        return False
+
+    def mark(self, workman_id: int, time: dt.datetime, duration: int, is_occupied: bool = True):
+        if not is_occupied:
+            # a slot might be covered by several intervals, so freed bitmaps are reloaded
+            self.invalidate_workman(workman_id)
+            return
+
+        end = time + dt.timedelta(seconds=duration)
+        local_date = get_timezone_offsets().to_local(time).date()
+        dates = {local_date - dt.timedelta(days=1)}
+        dates.update(local_date + dt.timedelta(days=i) for i in range(duration // 86400 + 2))
+
+        with self._lock:
+            for key in self._bitmaps.keys():
+                key_workman_id, work_regime_id, _date = key
+                if key_workman_id != workman_id or _date not in dates:
+                    continue
+
+                day_schedule = WorkRegimeSchedule.get_by_id(work_regime_id).get_day(_date)
+                if day_schedule is None:
+                    continue
+
+                mask = range_mask(*day_schedule.get_overlapping_range(_date, time, end))
+                if mask:
+                    self._bitmaps.set(key, self._bitmaps.get(key, 0) | mask)
+
+    def invalidate_workman(self, workman_id: int):
+        with self._lock:
+            self._bitmaps.invalidate(lambda key: key[0] == workman_id)
+
+    def invalidate_work_regime(self, work_regime_id: int):
+        with self._lock:
+            self._bitmaps.invalidate(lambda key: key[1] == work_regime_id)
+
+    def clear(self):
+        with self._lock:
+            self._bitmaps.clear()
+
+
+occupancy_index = OccupancyIndex(getattr(settings, "OCCUPANCY_INDEX_SIZE", 65536))
+
+
+def get_occupancy_index() -> Optional[OccupancyIndex]:
+    """
+        The index is opt-in (OCCUPANCY_INDEX setting): it is only correct when every write goes
+        through the same process, e.g. a single worker deployment.
+    """
+    if getattr(settings, "OCCUPANCY_INDEX", False):
+        return occupancy_index
+    return None
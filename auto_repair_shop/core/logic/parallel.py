@@ -0,0 +1,116 @@
+import datetime as dt
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+
+from core.logic.appointments_info import AppointmentInfo
+from core.logic.interval_index import WorkmenIntervals
+from core.logic.schedule import WorkRegimeSchedule
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+EXECUTOR_CLASSES = {
+    EXECUTOR_THREAD: ThreadPoolExecutor,
+    EXECUTOR_PROCESS: ProcessPoolExecutor,
+}
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+Day = Tuple[dt.date, Optional[dt.datetime], Optional[dt.datetime]]
+
+
+def get_executor() -> Tuple[Optional[str], Optional[Executor]]:
+    """
+        APPOINTMENTS_EXECUTOR: None (serial), "thread" (DB access in threads)
+                               or "process" (slot expansion in processes, DB access in the caller)
+        APPOINTMENTS_EXECUTOR_WORKERS: pool size
+    """
+    kind = getattr(settings, "APPOINTMENTS_EXECUTOR", None)
+    workers = getattr(settings, "APPOINTMENTS_EXECUTOR_WORKERS", 4)
+
+    if kind is None or workers < 2:
+        return None, None
+
+    key = (kind, workers)
+    with _executors_lock:
+        if key not in _executors:
+            _executors[key] = EXECUTOR_CLASSES[kind](max_workers=workers)
+        return kind, _executors[key]
+
+
+def chunk_days(days: List[Day]) -> List[List[Day]]:
+    size = max(1, getattr(settings, "APPOINTMENTS_EXECUTOR_DAYS_CHUNK", 7))
+    return [days[i:i + size] for i in range(0, len(days), size)]
+
+
+def expand_slots(schedule: WorkRegimeSchedule, days: List[Day],
+                 workmen: List[Tuple[int, int]], occupied: WorkmenIntervals) -> List[AppointmentInfo]:
+    """
+        Pure slot expansion (no DB access), so it can run in a separate process.
+        Order matches the processors: day -> workman -> slot.
+    """
+    res = []
+    for _date, wt_begin, wt_end in days:
+        day_schedule = schedule.get_day(_date)
+        if day_schedule is None:
+            continue
+
+        slots = day_schedule.project(_date, wt_begin, wt_end)
+        duration = day_schedule.appointment_duration
+        for workman_id, repair_shop_id in workmen:
+            for datetime_begin, datetime_end in slots:
+                res.append(AppointmentInfo(
+                    repair_shop_id,
+                    workman_id,
+                    datetime_begin,
+                    datetime_end,
+                    duration,
+                    occupied.overlaps(workman_id, datetime_begin, datetime_end)
+                ))
+    return res
+
+
+def _process_in_thread(data_processor, qs: QuerySet, work_regime,
+                       workman_ids: Optional[List[int]], days: List[Day]) -> List[AppointmentInfo]:
+    try:
+        return list(data_processor._process_days(qs, work_regime, days, workman_ids=workman_ids))
+    finally:
+        connections.close_all()
+
+
+def process_in_parallel(data_processor, qs: QuerySet) -> Iterator[AppointmentInfo]:
+    """
+        Fans (work regime, days chunk) units out to the configured executor,
+        results are merged in submission order so the output is deterministic.
+    """
+    kind, executor = get_executor()
+    chunks = chunk_days(list(data_processor.iter_days()))
+    futures = []
+
+    occupied_all = data_processor.occupied
+    if kind == EXECUTOR_PROCESS and data_processor.occupancy_index is not None:
+        occupied_all = data_processor.get_occupied(qs)
+
+    for work_regime, workman_ids in data_processor.iter_targets():
+        if kind == EXECUTOR_THREAD:
+            for days in chunks:
+                futures.append(executor.submit(_process_in_thread, data_processor, qs, work_regime, workman_ids, days))
+            continue
+
+        schedule = WorkRegimeSchedule.get(work_regime)
+        workmen = list(data_processor.get_workman_qs(work_regime, workman_ids).values_list("id", "repair_shop_id"))
+        if not workmen:
+            continue
+
+        occupied = occupied_all.subset(workman_id for workman_id, _ in workmen)
+        for days in chunks:
+            futures.append(executor.submit(expand_slots, schedule, days, workmen, occupied))
+
+    for future in futures:
+        yield from future.result()
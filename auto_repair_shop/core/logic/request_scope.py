@@ -0,0 +1,31 @@
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+_scope = contextvars.ContextVar("request_scope", default=None)
+
+
+@contextmanager
+def request_scope():
+    """
+        Opens a storage living until the end of the block (see core.middleware.RequestScopeMiddleware).
+        Outside of a scope nothing is memoized.
+    """
+    token = _scope.set({})
+    try:
+        yield _scope.get()
+    finally:
+        _scope.reset(token)
+
+
+def get_scope_cache(name: str) -> Optional[dict]:
+    scope = _scope.get()
+    if scope is None:
+        return None
+    return scope.setdefault(name, {})
+
+
+def clear_scope_cache(name: str):
+    scope = _scope.get()
+    if scope is not None:
+        scope.pop(name, None)
@@ -0,0 +1,254 @@
+import bisect
+import datetime as dt
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.models.work_regime import (WorkRegime, WorkRegimeDetail,
+                                     WorkRegimeExceptions, work_regime_cache)
+from core.utils.dateutils import get_timezone_offsets
+
+
+def _comb(v1: dt.date, v2: dt.time) -> dt.datetime:
+    return get_timezone_offsets().localize(v1, v2)
+
+
+def _seconds_between(t1: dt.time, t2: dt.time) -> int:
+    anchor = dt.date.min
+    return int((dt.datetime.combine(anchor, t2) - dt.datetime.combine(anchor, t1)).total_seconds())
+
+
+def _iter_offsets(stop: int, duration: int,
+                  lunch_begin: Optional[int], lunch_end: Optional[int]):
+    if not duration:
+        return
+
+    offset = 0
+    while offset < stop:
+        if lunch_begin is None or not (lunch_begin <= offset < lunch_end):
+            yield offset
+        offset += duration
+
+
+@dataclass(frozen=True)
+class DaySchedule:
+    """
+        Slot template of a single weekday (or of an exception date).
+        All offsets are in seconds from work_time_begin, lunch slots are already removed.
+    """
+    work_time_begin: dt.time
+    work_time_end: dt.time
+    shift_finish_on_next_day: bool
+    appointment_duration: int
+    lunch_begin_offset: Optional[int]
+    lunch_end_offset: Optional[int]
+    offsets: Tuple[int, ...]
+
+    @classmethod
+    def from_wrd(cls, wrd: WorkRegimeDetail) -> "DaySchedule":
+        duration = wrd.appointment_duration
+        length = _seconds_between(wrd.work_time_begin, wrd.work_time_end)
+        if wrd.shift_finish_on_next_day:
+            length += 24 * 60 * 60
+
+        lunch_begin_offset = lunch_end_offset = None
+        if wrd.lunch_time_begin and wrd.lunch_time_end:
+            lunch_begin_offset = _seconds_between(wrd.work_time_begin, wrd.lunch_time_begin)
+            lunch_end_offset = _seconds_between(wrd.work_time_begin, wrd.lunch_time_end)
+
+        offsets = _iter_offsets(length, duration, lunch_begin_offset, lunch_end_offset)
+
+        return cls(
+            work_time_begin=wrd.work_time_begin,
+            work_time_end=wrd.work_time_end,
+            shift_finish_on_next_day=wrd.shift_finish_on_next_day,
+            appointment_duration=duration,
+            lunch_begin_offset=lunch_begin_offset,
+            lunch_end_offset=lunch_end_offset,
+            offsets=tuple(offsets),
+        )
+
+    def get_borders(self, _date: dt.date) -> Tuple[dt.datetime, dt.datetime]:
+        work_time_begin = _comb(_date, self.work_time_begin)
+        work_time_end = _comb(_date, self.work_time_end)
+        if self.shift_finish_on_next_day:
+            work_time_end += dt.timedelta(days=1)
+        return work_time_begin, work_time_end
+
+    def get_slot_index(self, _date: dt.date, time: dt.datetime) -> Optional[int]:
+        """
+            Position of the slot beginning at `time` in self.offsets, None if there is no such slot.
+        """
+        work_time_begin, _ = self.get_borders(_date)
+        offset = (time - work_time_begin).total_seconds()
+        idx = bisect.bisect_left(self.offsets, offset)
+        if idx < len(self.offsets) and self.offsets[idx] == offset:
+            return idx
+        return None
+
+    def covers(self, _date: dt.date, time: dt.datetime, duration: int) -> bool:
+        """
+            Whether every slot of an appointment beginning at `time` and lasting `duration`
+            is on the grid of the day, computed from the template without projecting the day.
+        """
+        if not self.offsets or duration <= 0 or duration % self.appointment_duration:
+            return False
+
+        work_time_begin, _ = self.get_borders(_date)
+        offset = (time - work_time_begin).total_seconds()
+        if offset % self.appointment_duration:
+            return False
+
+        for slot_offset in range(int(offset), int(offset) + duration, self.appointment_duration):
+            if not 0 <= slot_offset <= self.offsets[-1]:
+                return False
+            if self.lunch_begin_offset is not None and self.lunch_begin_offset <= slot_offset < self.lunch_end_offset:
+                return False
+        return True
+
+    def get_overlapping_range(self, _date: dt.date, begin: dt.datetime, end: dt.datetime) -> Tuple[int, int]:
+        """
+            [lo, hi) range of self.offsets whose slots overlap begin <= time < end.
+        """
+        work_time_begin, _ = self.get_borders(_date)
+        begin_offset = (begin - work_time_begin).total_seconds()
+        end_offset = (end - work_time_begin).total_seconds()
+
+        lo = bisect.bisect_right(self.offsets, begin_offset - self.appointment_duration)
+        hi = bisect.bisect_left(self.offsets, end_offset)
+        return lo, max(lo, hi)
+
+    def get_slot_range(self, _date: dt.date,
+                       wt_begin: dt.datetime = None,
+                       wt_end: dt.datetime = None) -> Tuple[int, int]:
+        _, lo, hi = self._get_window(_date, wt_begin, wt_end)
+        return lo, hi
+
+    def _get_window(self, _date: dt.date,
+                    wt_begin: dt.datetime = None,
+                    wt_end: dt.datetime = None) -> Tuple[dt.datetime, int, int]:
+        """
+            Returns work_time_begin of the day and the [lo, hi) range of self.offsets
+            whose slots begin inside wt_begin <= slot < wt_end.
+        """
+        work_time_begin, work_time_end = self.get_borders(_date)
+
+        if wt_end:
+            work_time_end = min(wt_end, work_time_end)
+
+        lo = 0
+        if wt_begin and wt_begin > work_time_begin:
+            lo = bisect.bisect_left(self.offsets, (wt_begin - work_time_begin).total_seconds())
+
+        hi = bisect.bisect_left(self.offsets, (work_time_end - work_time_begin).total_seconds())
+        return work_time_begin, lo, max(lo, hi)
+
+    def project(self, _date: dt.date,
+                wt_begin: dt.datetime = None,
+                wt_end: dt.datetime = None) -> List[Tuple[dt.datetime, dt.datetime]]:
+        """
+            Returns (datetime_begin, datetime_end) pairs of the day clipped by wt_begin/wt_end.
+        """
+        work_time_begin, lo, hi = self._get_window(_date, wt_begin, wt_end)
+
+        duration = dt.timedelta(seconds=self.appointment_duration)
+        res = []
+        for offset in self.offsets[lo:hi]:
+            begin = work_time_begin + dt.timedelta(seconds=offset)
+            res.append((begin, begin + duration))
+        return res
+
+    def count(self, _date: dt.date,
+              wt_begin: dt.datetime = None,
+              wt_end: dt.datetime = None) -> int:
+        """
+            Same as len(self.project(...)) without building the slots.
+        """
+        _, lo, hi = self._get_window(_date, wt_begin, wt_end)
+        return hi - lo
+
+
+class WorkRegimeSchedule(object):
+    """
+        Compiled weekday templates of a work regime plus its exceptions (holidays, shortened days).
+        Exceptions are kept as a date -> DaySchedule map (None for a day off) compiled and cached
+        together with the regime, so they cost no per-day queries however long the requested range is.
+    """
+
+    def __init__(self, work_regime_id: int, days: Dict[int, DaySchedule],
+                 exceptions: Dict[dt.date, Optional[DaySchedule]] = None):
+        self.work_regime_id = work_regime_id
+        self.days = days
+        self.exceptions = exceptions or {}
+
+    @staticmethod
+    def _compile_exception(wre: WorkRegimeExceptions) -> Optional[DaySchedule]:
+        if wre.is_holiday or wre.work_time_begin is None or wre.work_time_end is None:
+            return None
+        return DaySchedule.from_wrd(wre)
+
+    @classmethod
+    def _compile(cls, work_regime_id: int) -> "WorkRegimeSchedule":
+        details = WorkRegimeDetail.objects.filter(work_regime__id=work_regime_id)
+        days = {wrd.day_of_week: DaySchedule.from_wrd(wrd) for wrd in details}
+
+        exceptions = WorkRegimeExceptions.objects.filter(work_regime__id=work_regime_id)
+        exceptions = {wre.date: cls._compile_exception(wre) for wre in exceptions}
+        return cls(work_regime_id, days, exceptions)
+
+    @classmethod
+    def compile(cls, work_regime: WorkRegime) -> "WorkRegimeSchedule":
+        return cls._compile(work_regime.id)
+
+    @classmethod
+    def get_by_id(cls, work_regime_id: int) -> "WorkRegimeSchedule":
+        return work_regime_cache.get_or_set(
+            ("schedule", work_regime_id), lambda: cls._compile(work_regime_id)
+        )
+
+    @classmethod
+    def get(cls, work_regime: WorkRegime) -> "WorkRegimeSchedule":
+        return cls.get_by_id(work_regime.id)
+
+    @classmethod
+    def prefetch(cls, work_regime_ids: Iterable[int]):
+        """
+            Compiles the schedules missing in the cache with a query per model.
+        """
+        generation = work_regime_cache.generation
+        missing = {work_regime_id for work_regime_id in work_regime_ids
+                   if ("schedule", work_regime_id) not in work_regime_cache}
+        if not missing:
+            return
+
+        days = {work_regime_id: {} for work_regime_id in missing}
+        for wrd in WorkRegimeDetail.objects.filter(work_regime_id__in=missing):
+            days[wrd.work_regime_id][wrd.day_of_week] = DaySchedule.from_wrd(wrd)
+
+        exceptions = {work_regime_id: {} for work_regime_id in missing}
+        for wre in WorkRegimeExceptions.objects.filter(work_regime_id__in=missing):
+            exceptions[wre.work_regime_id][wre.date] = cls._compile_exception(wre)
+
+        for work_regime_id in missing:
+            schedule = cls(work_regime_id, days[work_regime_id], exceptions[work_regime_id])
+            work_regime_cache.set(("schedule", work_regime_id), schedule, generation)
+
+    def get_day(self, _date: dt.date) -> Optional[DaySchedule]:
+        if _date in self.exceptions:
+            return self.exceptions[_date]
+        return self.days.get(_date.weekday())
+
+    def project(self, _date: dt.date,
+                wt_begin: dt.datetime = None,
+                wt_end: dt.datetime = None) -> List[Tuple[dt.datetime, dt.datetime]]:
+        day = self.get_day(_date)
+        if day is None:
+            return []
+        return day.project(_date, wt_begin, wt_end)
+
+    def count(self, _date: dt.date,
+              wt_begin: dt.datetime = None,
+              wt_end: dt.datetime = None) -> int:
+        day = self.get_day(_date)
+        if day is None:
+            return 0
+        return day.count(_date, wt_begin, wt_end)
@@ -0,0 +1,180 @@
+import datetime as dt
+import operator
+from functools import reduce
+from typing import Iterator, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from core.logic.appointments_info import AppointmentInfo, BaseDataProcessor
+from core.logic.interval_index import IntervalIndex, WorkmenIntervals
+from core.logic.schedule import WorkRegimeSchedule
+from core.models.work_regime import WorkRegime
+from core.models.workflow import Appointments, SlotAvailability
+from core.utils.dateutils import get_day_begin
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "SLOT_AVAILABILITY", False)
+
+
+def build_slots(date_begin: dt.date, date_end: dt.date, work_regime_ids: List[int] = None) -> int:
+    """
+        (Re)creates rows of date_begin <= date <= date_end from the compiled work regime schedules,
+        every work regime gets a row per slot for each of its workmen (as DateProcessor yields them).
+        Returns the number of created rows.
+    """
+    regimes = WorkRegime.objects.all()
+    stale = SlotAvailability.objects.filter(date__gte=date_begin, date__lte=date_end)
+    if work_regime_ids is not None:
+        regimes = regimes.filter(id__in=work_regime_ids)
+        stale = stale.filter(work_regime_id__in=work_regime_ids)
+
+    days = [date_begin + dt.timedelta(days=n) for n in range((date_end - date_begin).days + 1)]
+    occupied = WorkmenIntervals.from_qs(Appointments.objects.filter(
+        time__gt=get_day_begin(date_begin - dt.timedelta(days=1)),
+        time__lt=get_day_begin(date_end + dt.timedelta(days=2)),
+    ))
+
+    created = 0
+    with transaction.atomic():
+        stale.delete()
+
+        for work_regime in regimes:
+            workman_ids = list(BaseDataProcessor.get_workman_qs(work_regime).values_list("id", flat=True))
+            if not workman_ids:
+                continue
+
+            schedule = WorkRegimeSchedule.get(work_regime)
+            rows = [
+                SlotAvailability(
+                    workman_id=workman_id,
+                    work_regime_id=work_regime.id,
+                    date=_date,
+                    slot_begin=begin,
+                    slot_end=end,
+                    is_free=not occupied.overlaps(workman_id, begin, end),
+                )
+                for _date in days
+                for begin, end in schedule.project(_date)
+                for workman_id in workman_ids
+            ]
+            SlotAvailability.objects.bulk_create(rows, batch_size=1000)
+            created += len(rows)
+
+    return created
+
+
+def extend_horizon(days: int = None, today: dt.date = None) -> int:
+    """
+        Drops past rows and builds the days missing up to today + days.
+    """
+    days = days or getattr(settings, "SLOT_AVAILABILITY_HORIZON_DAYS", 60)
+    today = today or timezone.localdate()
+    horizon_end = today + dt.timedelta(days=days - 1)
+
+    SlotAvailability.objects.filter(date__lt=today).delete()
+
+    last = SlotAvailability.objects.aggregate(last=Max("date"))["last"]
+    date_begin = today if last is None or last < today else last + dt.timedelta(days=1)
+    if date_begin > horizon_end:
+        return 0
+
+    return build_slots(date_begin, horizon_end)
+
+
+def rebuild_work_regime(work_regime_id: int) -> int:
+    horizon = SlotAvailability.objects.aggregate(first=Min("date"), last=Max("date"))
+    if horizon["first"] is None:
+        return 0
+
+    return build_slots(horizon["first"], horizon["last"], work_regime_ids=[work_regime_id])
+
+
+def sync_workman(workman_id: int, begin: dt.datetime = None, end: dt.datetime = None):
+    """
+        Flips is_free of the rows overlapping [begin, end) (the whole horizon by default) after a booking change.
+        Rows are recomputed instead of being set, a slot might be covered by another appointment.
+    """
+    slots = SlotAvailability.objects.filter(workman_id=workman_id)
+    if begin is not None and end is not None:
+        slots = slots.filter(slot_begin__lt=end, slot_end__gt=begin)
+
+    slots = list(slots.values_list("id", "slot_begin", "slot_end"))
+    if not slots:
+        return
+
+    lower = min(slot_begin for _, slot_begin, _ in slots)
+    upper = max(slot_end for _, _, slot_end in slots)
+
+    # appointments never last longer than a work day
+    intervals = IntervalIndex(Appointments.objects.filter(
+        workman_id=workman_id,
+        time__gt=lower - dt.timedelta(days=1),
+        time__lt=upper,
+    ).values_list("time", "duration"))
+
+    free_ids, occupied_ids = [], []
+    for slot_id, slot_begin, slot_end in slots:
+        if intervals.overlaps(slot_begin, slot_end):
+            occupied_ids.append(slot_id)
+        else:
+            free_ids.append(slot_id)
+
+    if free_ids:
+        SlotAvailability.objects.filter(id__in=free_ids).update(is_free=True)
+    if occupied_ids:
+        SlotAvailability.objects.filter(id__in=occupied_ids).update(is_free=False)
+
+
+def iter_available_slots(data_processor: BaseDataProcessor) -> Optional[Iterator[AppointmentInfo]]:
+    """
+        Available slots of the processor read from the table (ordered by time),
+        None when the requested days are not materialised yet.
+    """
+    if data_processor.from_archive:
+        return None
+
+    days = list(data_processor.iter_days())
+    horizon = SlotAvailability.objects.aggregate(first=Min("date"), last=Max("date"))
+    if not days or horizon["first"] is None or days[0][0] < horizon["first"] or days[-1][0] > horizon["last"]:
+        return None
+
+    regime_ids, conditions = [], []
+    for work_regime, workman_ids in data_processor.iter_targets():
+        if work_regime is None:
+            continue
+        if workman_ids:
+            conditions.append(Q(work_regime_id=work_regime.id, workman_id__in=workman_ids))
+        else:
+            regime_ids.append(work_regime.id)
+
+    if regime_ids:
+        conditions.append(Q(work_regime_id__in=regime_ids))
+    if not conditions:
+        return iter(())
+
+    _, wt_begin, wt_end = days[0]
+    time_qs = {}
+    if wt_begin:
+        time_qs["slot_begin__gte"] = wt_begin
+    if wt_end:
+        time_qs["slot_begin__lt"] = wt_end
+
+    rows = SlotAvailability.objects.filter(
+        reduce(operator.or_, conditions),
+        is_free=True,
+        date__gte=days[0][0],
+        date__lte=days[-1][0],
+        **time_qs
+    ).order_by(
+        "slot_begin", "workman_id"
+    ).values_list("workman__repair_shop_id", "workman_id", "slot_begin", "slot_end")
+
+    return (
+        AppointmentInfo(repair_shop_id, workman_id, slot_begin, slot_end,
+                        int((slot_end - slot_begin).total_seconds()), False)
+        for repair_shop_id, workman_id, slot_begin, slot_end in rows.iterator()
+    )
@@ -0,0 +1,194 @@
+import datetime as dt
+from collections import defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+from django.conf import settings
+
+from core.logic.appointments_info import AppointmentInfo, BaseDataProcessor, ProcessorArgs
+from core.logic.schedule import WorkRegimeSchedule
+from core.utils.dateutils import get_timezone_offsets
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+
+class SlotGrid(object):
+    """
+        Vectorised alternative to the processors pipeline (requires numpy).
+        Slots of all workmen x days are kept as flat arrays in the same order the processors yield them.
+    """
+
+    def __init__(self, workman_ids, repair_shop_ids, begins, durations, is_occupied):
+        super().__init__()
+        self.workman_ids = workman_ids
+        self.repair_shop_ids = repair_shop_ids
+        self.begins = begins  # epoch seconds
+        self.durations = durations
+        self.is_occupied = is_occupied
+
+    def __len__(self):
+        return len(self.begins)
+
+    @property
+    def total_cnt(self) -> int:
+        return len(self.begins)
+
+    @property
+    def occupied_cnt(self) -> int:
+        return int(np.count_nonzero(self.is_occupied))
+
+    @property
+    def available_cnt(self) -> int:
+        return self.total_cnt - self.occupied_cnt
+
+    def as_arrays(self) -> Dict[str, "np.ndarray"]:
+        return {
+            "workman_id": self.workman_ids,
+            "repair_shop_id": self.repair_shop_ids,
+            "datetime_begin": self.begins.astype("datetime64[s]"),
+            "datetime_end": (self.begins + self.durations).astype("datetime64[s]"),
+            "duration": self.durations,
+            "is_occupied": self.is_occupied,
+        }
+
+    def iter_appointments(self) -> Iterator[AppointmentInfo]:
+        tz_offsets = get_timezone_offsets()
+        rows = zip(self.repair_shop_ids.tolist(), self.workman_ids.tolist(), self.begins.tolist(),
+                   self.durations.tolist(), self.is_occupied.tolist())
+
+        for repair_shop_id, workman_id, begin, duration, is_occupied in rows:
+            datetime_begin = tz_offsets.to_local(_EPOCH + dt.timedelta(seconds=begin))
+            yield AppointmentInfo(
+                repair_shop_id,
+                workman_id,
+                datetime_begin,
+                datetime_begin + dt.timedelta(seconds=duration),
+                duration,
+                is_occupied
+            )
+
+    @staticmethod
+    def _build_regime_grid(schedule: WorkRegimeSchedule,
+                           days: List[Tuple[dt.date, dt.datetime, dt.datetime]]):
+        """
+            Returns (day index, begin, duration) arrays of one workman of the regime.
+            Lunch is already cut out of the compiled offsets, days are grouped by their day schedule
+            (weekday template or exception) so every group is a single 2d (days x offsets) operation.
+        """
+        by_day_schedule = defaultdict(list)
+        for day_idx, (_date, wt_begin, wt_end) in enumerate(days):
+            day = schedule.get_day(_date)
+            if day is not None and day.offsets:
+                by_day_schedule[day].append((day_idx, _date, wt_begin, wt_end))
+
+        chunks = []
+        for day, schedule_days in by_day_schedule.items():
+            day_idx, bases, lower, upper = [], [], [], []
+            for idx, _date, wt_begin, wt_end in schedule_days:
+                work_time_begin, work_time_end = day.get_borders(_date)
+                if wt_end:
+                    work_time_end = min(wt_end, work_time_end)
+
+                day_idx.append(idx)
+                bases.append(int(work_time_begin.timestamp()))
+                lower.append(wt_begin.timestamp() if wt_begin else float("-inf"))
+                upper.append(work_time_end.timestamp())
+
+            grid = np.asarray(bases, dtype=np.int64)[:, None] + np.asarray(day.offsets, dtype=np.int64)[None, :]
+            mask = (grid >= np.asarray(lower)[:, None]) & (grid < np.asarray(upper)[:, None])
+
+            rows = np.broadcast_to(np.asarray(day_idx, dtype=np.int64)[:, None], grid.shape)
+            chunks.append((rows[mask], grid[mask], np.full(np.count_nonzero(mask), day.appointment_duration)))
+
+        if not chunks:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+
+        day_idx = np.concatenate([c[0] for c in chunks])
+        begins = np.concatenate([c[1] for c in chunks])
+        durations = np.concatenate([c[2] for c in chunks]).astype(np.int64)
+
+        order = np.lexsort((begins, day_idx))
+        return day_idx[order], begins[order], durations[order]
+
+    @staticmethod
+    def _overlaps(begins, ends, intervals):
+        """
+            Vectorised IntervalIndex.overlaps: slot i is occupied if any booked [b, e)
+            with b < ends[i] has e > begins[i] (prefix maximum of sorted intervals ends).
+        """
+        if not intervals:
+            return np.zeros(len(begins), dtype=bool)
+
+        booked = np.asarray(sorted(intervals), dtype=np.int64)
+        max_ends = np.maximum.accumulate(booked[:, 1])
+        idx = np.searchsorted(booked[:, 0], ends, side="left")
+        return (idx > 0) & (max_ends[np.maximum(idx - 1, 0)] > begins)
+
+    @classmethod
+    def build(cls, data_processor: BaseDataProcessor) -> "SlotGrid":
+        if np is None:
+            raise ImportError("numpy is required for SlotGrid")
+
+        qs = data_processor.filter_qs(data_processor.get_qs())
+        booked = defaultdict(list)
+        for workman_id, time, duration in qs.values_list("workman_id", "time", "duration"):
+            begin = int(time.timestamp())
+            booked[workman_id].append((begin, begin + duration))
+
+        days = list(data_processor.iter_days())
+        parts = []
+
+        for work_regime, workman_ids in data_processor.iter_targets():
+            if work_regime is None:
+                continue
+
+            workmen = list(data_processor.get_workman_qs(work_regime, workman_ids).values_list("id", "repair_shop_id"))
+            if not workmen:
+                continue
+
+            schedule = WorkRegimeSchedule.get(work_regime)
+            day_idx, begins, durations = cls._build_regime_grid(schedule, days)
+            if not len(begins):
+                continue
+
+            slot_cnt = len(begins)
+            ids = np.asarray([w[0] for w in workmen], dtype=np.int64)
+            shop_ids = np.asarray([w[1] for w in workmen], dtype=np.int64)
+
+            occupied = np.concatenate([
+                cls._overlaps(begins, begins + durations, booked.get(workman_id, ()))
+                for workman_id in ids.tolist()
+            ])
+
+            # processors order: day -> workman -> slot
+            order = np.argsort(np.tile(day_idx, len(workmen)), kind="stable")
+            parts.append((
+                np.repeat(ids, slot_cnt)[order],
+                np.repeat(shop_ids, slot_cnt)[order],
+                np.tile(begins, len(workmen))[order],
+                np.tile(durations, len(workmen))[order],
+                occupied[order],
+            ))
+
+        if not parts:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(empty, empty, empty, empty, np.empty(0, dtype=bool))
+
+        return cls(*(np.concatenate([part[i] for part in parts]) for i in range(5)))
+
+
+def get_slot_grid(**args) -> SlotGrid:
+    data_processor = ProcessorArgs.from_dict(args).get_processor()
+    return SlotGrid.build(data_processor)
+
+
+def is_slot_grid_enabled() -> bool:
+    """
+        The grid is opt-in (SLOT_GRID setting) and falls back to the engines without numpy.
+    """
+    return np is not None and getattr(settings, "SLOT_GRID", False)
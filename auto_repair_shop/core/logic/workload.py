@@ -0,0 +1,142 @@
+import datetime as dt
+from dataclasses import dataclass
+from typing import Optional
+
+from core.logic.appointments_info import BaseDataProcessor, ProcessorArgs
+from core.logic.interval_index import WorkmenIntervals
+from core.logic.occupancy_index import popcount, range_mask
+from core.logic.schedule import WorkRegimeSchedule
+from core.logic.slot_grid import SlotGrid, is_slot_grid_enabled
+
+
+@dataclass
+class Workload:
+    total: int
+    occupied: int
+
+    @property
+    def available(self) -> int:
+        return self.total - self.occupied
+
+    @property
+    def percent(self) -> Optional[float]:
+        return round(self.occupied / self.total * 100, 2) if self.total else None
+
+
+class WorkloadEngine(object):
+    """
+        Counts slots of a processor without building AppointmentInfo objects:
+        capacity is derived from the compiled work regime schedule (exceptions included),
+        occupied slots are counted by popcount over the occupancy index when it is enabled
+        or by popcount over the slots of each day covered by booked intervals otherwise,
+        so appointments off the grid of their day (e.g. after a shortened exception day) are not counted.
+        With SLOT_GRID on, both amounts are counted over the arrays of the vectorised slot grid instead.
+    """
+
+    def __init__(self, data_processor: BaseDataProcessor, occupied: WorkmenIntervals = None):
+        super().__init__()
+        self.data_processor = data_processor
+        # booked intervals prefetched for several engines (core.logic.batch)
+        self.occupied = occupied
+
+    def get_capacity(self) -> int:
+        total = 0
+        days = list(self.data_processor.iter_days())
+
+        for work_regime, workman_ids in self.data_processor.iter_targets():
+            if work_regime is None:
+                continue
+
+            workman_cnt = len(self.data_processor.get_workmen(work_regime, workman_ids))
+            if not workman_cnt:
+                continue
+
+            schedule = WorkRegimeSchedule.get(work_regime)
+            total += workman_cnt * sum(schedule.count(*day) for day in days)
+
+        return total
+
+    def _get_occupied_from_index(self, occupancy_index) -> int:
+        occupied = 0
+        days = list(self.data_processor.iter_days())
+
+        for work_regime, workman_ids in self.data_processor.iter_targets():
+            if work_regime is None:
+                continue
+
+            schedule = WorkRegimeSchedule.get(work_regime)
+            workman_ids = [workman.id for workman in self.data_processor.get_workmen(work_regime, workman_ids)]
+
+            for _date, wt_begin, wt_end in days:
+                day_schedule = schedule.get_day(_date)
+                if day_schedule is None:
+                    continue
+
+                lo, hi = day_schedule.get_slot_range(_date, wt_begin, wt_end)
+                occupied += sum(
+                    occupancy_index.count_occupied(workman_id, work_regime, _date, lo, hi)
+                    for workman_id in workman_ids
+                )
+
+        return occupied
+
+    def _get_occupied_from_intervals(self, intervals: WorkmenIntervals) -> int:
+        occupied = 0
+        days = list(self.data_processor.iter_days())
+
+        for work_regime, workman_ids in self.data_processor.iter_targets():
+            if work_regime is None:
+                continue
+
+            schedule = WorkRegimeSchedule.get(work_regime)
+            workman_ids = [workman.id for workman in self.data_processor.get_workmen(work_regime, workman_ids)
+                           if workman.id in intervals.indexes]
+
+            for _date, wt_begin, wt_end in days:
+                day_schedule = schedule.get_day(_date)
+                if day_schedule is None:
+                    continue
+
+                lo, hi = day_schedule.get_slot_range(_date, wt_begin, wt_end)
+                if lo == hi:
+                    continue
+
+                # only the intervals overlapping the window of the day are mapped onto its grid
+                work_time_begin, _ = day_schedule.get_borders(_date)
+                window_begin = work_time_begin + dt.timedelta(seconds=day_schedule.offsets[lo])
+                window_end = work_time_begin + dt.timedelta(
+                    seconds=day_schedule.offsets[hi - 1] + day_schedule.appointment_duration
+                )
+
+                window = range_mask(lo, hi)
+                for workman_id in workman_ids:
+                    bitmap = 0
+                    for begin, end in intervals.indexes[workman_id].iter_overlapping(window_begin, window_end):
+                        bitmap |= range_mask(*day_schedule.get_overlapping_range(_date, begin, end))
+                    occupied += popcount(bitmap & window)
+
+        return occupied
+
+    def get_occupied(self) -> int:
+        occupancy_index = self.data_processor.occupancy_index
+        if occupancy_index is not None:
+            return self._get_occupied_from_index(occupancy_index)
+
+        if self.occupied is not None:
+            return self._get_occupied_from_intervals(self.occupied)
+
+        qs = self.data_processor.filter_qs(self.data_processor.get_qs())
+        return self._get_occupied_from_intervals(self.data_processor.get_occupied(qs))
+
+    def get_workload(self) -> Workload:
+        # the grid queries the bookings itself, prefetched intervals and the index are cheaper
+        if self.occupied is None and self.data_processor.occupancy_index is None and is_slot_grid_enabled():
+            grid = SlotGrid.build(self.data_processor)
+            return Workload(total=grid.total_cnt, occupied=grid.occupied_cnt)
+
+        return Workload(total=self.get_capacity(), occupied=self.get_occupied())
+
+
+def get_workload(**args) -> Workload:
+    data_processor = ProcessorArgs.from_dict(args).get_processor()
+    return WorkloadEngine(data_processor).get_workload()
@@ -0,0 +1,34 @@
+import datetime as dt
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from core.logic import slot_availability
+from core.models.workflow import SlotAvailability
+
+
+class Command(BaseCommand):
+    help = "Extends the materialised slots table up to the horizon (meant to be run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=getattr(settings, "SLOT_AVAILABILITY_HORIZON_DAYS", 60),
+            help="Horizon length in days starting from today",
+        )
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Rebuild the whole horizon instead of adding the missing days",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            today = timezone.localdate()
+            SlotAvailability.objects.all().delete()
+            created = slot_availability.build_slots(today, today + dt.timedelta(days=options["days"] - 1))
+        else:
+            created = slot_availability.extend_horizon(options["days"])
+
+        last = SlotAvailability.objects.aggregate(last=Max("date"))["last"]
+        self.stdout.write(f"Created {created} slots, horizon ends on {last}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.logic.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Deletes the idempotency keys older than IDEMPOTENCY_KEY_TTL (meant to be run periodically)"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(f"Deleted {deleted} expired idempotency keys")
@@ -0,0 +1,12 @@
+
+from core.logic.request_scope import request_scope
+
+
+class RequestScopeMiddleware(object):
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_scope():
+            return self.get_response(request)
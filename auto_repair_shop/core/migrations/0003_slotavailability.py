@@ -0,0 +1,32 @@
+# Generated by Django 3.1 on 2026-10-18 08:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_auto_20200810_1757'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotAvailability',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Work day')),
+                ('slot_begin', models.DateTimeField(verbose_name='Slot start time')),
+                ('slot_end', models.DateTimeField(verbose_name='Slot end time')),
+                ('is_free', models.BooleanField(default=True, verbose_name='Is free')),
+                ('work_regime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.workregime', verbose_name='Work regime')),
+                ('workman', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.workman', verbose_name='Repair mechanic')),
+            ],
+            options={
+                'verbose_name': 'Slot availability',
+                'verbose_name_plural': 'Slots availability',
+                'unique_together': {('workman', 'work_regime', 'slot_begin')},
+                'index_together': {('is_free', 'date', 'slot_begin')},
+            },
+        ),
+    ]
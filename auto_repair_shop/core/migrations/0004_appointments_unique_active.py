@@ -0,0 +1,17 @@
+# Generated by Django 3.1 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_slotavailability'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='appointments',
+            constraint=models.UniqueConstraint(condition=models.Q(is_deleted=False), fields=('workman', 'time'), name='unique_active_appointment'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.1 on 2026-10-18 09:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_appointments_unique_active'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, verbose_name='Idempotency key')),
+                ('endpoint', models.CharField(max_length=64, verbose_name='Endpoint')),
+                ('request_hash', models.CharField(max_length=64, verbose_name='Request hash')),
+                ('response', models.JSONField(blank=True, null=True, verbose_name='Response')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Creation time')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Customer')),
+            ],
+            options={
+                'verbose_name': 'Idempotency key',
+                'verbose_name_plural': 'Idempotency keys',
+                'unique_together': {('customer', 'endpoint', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.1 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointments',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['workman', 'date', 'time'], name='appointments_workman'),
+        ),
+        migrations.AddIndex(
+            model_name='appointments',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['work_regime', 'date'], name='appointments_regime'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentsarchive',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['workman', 'date', 'time'], name='appointmentsarchive_workman'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentsarchive',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['work_regime', 'date'], name='appointmentsarchive_regime'),
+        ),
+    ]
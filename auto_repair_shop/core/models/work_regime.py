@@ -1,9 +1,13 @@
+import copy
 
+
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from core.models.managers import IsDeletedModel
+from core.utils.lru import LRUCache
 
 __all__ = (
     'WorkRegime',
@@ -22,6 +26,14 @@ class DaysOfTheWeek(dict):
     SUNDAY = 6
 
 
+# keys are tuples (kind, work_regime_id, ...), invalidated in core.signals
+work_regime_cache = LRUCache(getattr(settings, "WORK_REGIME_CACHE_SIZE", 4096))
+
+
+def invalidate_work_regime_cache(work_regime_id: int):
+    work_regime_cache.invalidate(lambda key: key[1] == work_regime_id)
+
+
 DAYS_OF_THE_WEEK = DaysOfTheWeek({
     DaysOfTheWeek.MONDAY: _("Monday"),
     DaysOfTheWeek.TUESDAY: _("Tuesday"),
@@ -44,27 +56,32 @@ class WorkRegime(IsDeletedModel):
     def __str__(self):
         return self.name
 
-    def _get_wrd_exception(self, date):
-        try:
-            return WorkRegimeExceptions.objects.get(
-                work_regime__id=self.id,
-                date=date
-            )
-        except ObjectDoesNotExist:
-            return None
-
-    def get_wrd(self, date, is_exception=False):
-        if is_exception:
-            return self._get_wrd_exception(date)
+    def _get_wrd_exceptions(self):
+        # all exceptions of the regime at once, a per-date query would be paid for every day of a range
+        return {
+            wre.date: wre for wre in WorkRegimeExceptions.objects.filter(work_regime__id=self.id)
+        }
 
+    def _get_wrd(self, day_of_week):
         try:
             return WorkRegimeDetail.objects.get(
                 work_regime__id=self.id,
-                day_of_week=date.weekday()
+                day_of_week=day_of_week
             )
         except ObjectDoesNotExist:
             return None
 
+    def get_wrd(self, date, is_exception=False):
+        # copies: the caller may change and save the instance, the cached one must stay as it is in the db
+        exceptions = work_regime_cache.get_or_set(("wre", self.id), self._get_wrd_exceptions)
+        if is_exception or date in exceptions:
+            return copy.copy(exceptions.get(date))
+
+        day_of_week = date.weekday()
+        return copy.copy(work_regime_cache.get_or_set(
+            ("wrd", self.id, day_of_week), lambda: self._get_wrd(day_of_week)
+        ))
+
 
 def get_work_time_args(is_work_time_optional: bool) -> dict:
     _d = {}
@@ -7,6 +7,8 @@ from core.models.managers import IsDeletedModel
 __all__ = (
     'AppointmentsArchive',
     'Appointments',
+    'SlotAvailability',
+    'IdempotencyKey',
 )
 
 
@@ -20,6 +22,19 @@ class BaseAppointmentsClass(IsDeletedModel):
 
     class Meta:
         abstract = True
+        # the hot queries always filter out deleted appointments (IsDeletedManager)
+        indexes = [
+            models.Index(
+                fields=("workman", "date", "time"),
+                condition=models.Q(is_deleted=False),
+                name="%(class)s_workman",
+            ),
+            models.Index(
+                fields=("work_regime", "date"),
+                condition=models.Q(is_deleted=False),
+                name="%(class)s_regime",
+            ),
+        ]
 
     def __str__(self):
         workman = self.workman.get_full_name()
@@ -31,13 +46,66 @@ class BaseAppointmentsClass(IsDeletedModel):
 
 class AppointmentsArchive(BaseAppointmentsClass):
 
-    class Meta:
+    class Meta(BaseAppointmentsClass.Meta):
         verbose_name = _('Appointment (archive)')
         verbose_name_plural = _('Appointments (archive)')
 
 
 class Appointments(BaseAppointmentsClass):
 
-    class Meta:
+    class Meta(BaseAppointmentsClass.Meta):
         verbose_name = _('Appointment')
         verbose_name_plural = _('Appointments')
+        constraints = [
+            # a workman can't have two active appointments beginning at the same time
+            models.UniqueConstraint(
+                fields=("workman", "time"),
+                condition=models.Q(is_deleted=False),
+                name="unique_active_appointment",
+            ),
+        ]
+
+
+class SlotAvailability(models.Model):
+    """
+        Materialised slots of the work regimes (core.logic.slot_availability),
+        derived data, so rows are deleted instead of being marked as deleted.
+    """
+    workman = models.ForeignKey("Workman", verbose_name=_("Repair mechanic"), on_delete=models.CASCADE)
+    work_regime = models.ForeignKey("WorkRegime", verbose_name=_("Work regime"), on_delete=models.CASCADE)
+    date = models.DateField(verbose_name=_('Work day'))
+    slot_begin = models.DateTimeField(verbose_name=_('Slot start time'))
+    slot_end = models.DateTimeField(verbose_name=_('Slot end time'))
+    is_free = models.BooleanField(default=True, verbose_name=_('Is free'))
+
+    class Meta:
+        verbose_name = _('Slot availability')
+        verbose_name_plural = _('Slots availability')
+        unique_together = (("workman", "work_regime", "slot_begin"),)
+        index_together = (("is_free", "date", "slot_begin"),)
+
+    def __str__(self):
+        date_format = '%Y/%m/%d %H:%M'
+        return f"{self.slot_begin.strftime(date_format)} ({self.workman_id})"
+
+
+class IdempotencyKey(models.Model):
+    """
+        First response to a request sent with an Idempotency-Key header (core.logic.idempotency),
+        kept for IDEMPOTENCY_KEY_TTL seconds, so client retries are answered without re-running it.
+        Derived data, so rows are deleted instead of being marked as deleted.
+    """
+    key = models.CharField(max_length=255, verbose_name=_('Idempotency key'))
+    customer = models.ForeignKey("User", verbose_name=_("Customer"), on_delete=models.CASCADE)
+    endpoint = models.CharField(max_length=64, verbose_name=_('Endpoint'))
+    request_hash = models.CharField(max_length=64, verbose_name=_('Request hash'))
+    response = models.JSONField(null=True, blank=True, verbose_name=_('Response'))
+    created = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_('Creation time'))
+
+    class Meta:
+        verbose_name = _('Idempotency key')
+        verbose_name_plural = _('Idempotency keys')
+        unique_together = (("customer", "endpoint", "key"),)
+
+    def __str__(self):
+        return f"{self.endpoint}: {self.key} ({self.customer_id})"
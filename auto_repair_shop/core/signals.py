@@ -0,0 +1,35 @@
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.logic import slot_availability
+from core.logic.occupancy_index import occupancy_index
+from core.models.staff import Workman
+from core.models.work_regime import (WorkRegime, WorkRegimeDetail,
+                                     WorkRegimeExceptions,
+                                     invalidate_work_regime_cache)
+
+
+@receiver([post_save, post_delete], sender=WorkRegime)
+def work_regime_changed(sender, instance, **kwargs):
+    invalidate_work_regime_cache(instance.id)
+    occupancy_index.invalidate_work_regime(instance.id)
+    if slot_availability.is_enabled():
+        slot_availability.rebuild_work_regime(instance.id)
+
+
+@receiver([post_save, post_delete], sender=WorkRegimeDetail)
+@receiver([post_save, post_delete], sender=WorkRegimeExceptions)
+def work_regime_details_changed(sender, instance, **kwargs):
+    invalidate_work_regime_cache(instance.work_regime_id)
+    occupancy_index.invalidate_work_regime(instance.work_regime_id)
+    if slot_availability.is_enabled():
+        slot_availability.rebuild_work_regime(instance.work_regime_id)
+
+
+@receiver([post_save, post_delete], sender=Workman)
+def workman_changed(sender, instance, **kwargs):
+    if slot_availability.is_enabled():
+        for work_regime_id in {instance.repair_shop.default_work_regime_id, instance.individual_work_regime_id}:
+            if work_regime_id is not None:
+                slot_availability.rebuild_work_regime(work_regime_id)
@@ -1,15 +1,27 @@
 
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
+from unittest import mock
 
 import pytest
 import pytz
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import make_aware
+from django.utils.translation import gettext_lazy as _
 
-from core.logic.appointments_actions import (delete_an_appointment,
+from core.logic.appointments_actions import (AppointmentsModelCommunicator,
+                                             delete_an_appointment,
                                              make_an_appointment,
                                              move_an_appointment)
+from core.logic.appointments_info import (get_all_appointments,
+                                          get_occupied_appointments)
+from core.logic.request_scope import request_scope
+from core.models.work_regime import WorkRegimeDetail
 from core.models.workflow import Appointments
 from core.tests.pytests.data_generators import SimpleTestDataGenerator
+from core.tests.pytests.model_fillers.structure import (
+    generate_work_regime, generate_work_regime_details)
 
 
 class TestAppointmentsProcessors(SimpleTestDataGenerator):
@@ -128,3 +140,210 @@ class TestAppointmentsProcessors(SimpleTestDataGenerator):
             workman__id=self.workmans[3].id,
             customer_id=self.user.id
         ).exists()
+
+    @pytest.mark.django_db
+    def test_create_several_slots(self):
+        self.generate_data()
+
+        _date = make_aware(datetime(2020, 8, 5, 11), pytz.UTC)
+        workman_id = self.workmans[3].id
+
+        data = {
+            "time": _date,
+            "workman_id": workman_id,
+            "user_id": self.user.id,
+        }
+
+        # not a multiple of the slot duration
+        assert make_an_appointment(**data, duration="5400")[0] is True
+        # 13:00 - 15:00 crosses the lunch break
+        assert make_an_appointment(**{**data, "time": _date + timedelta(hours=2)}, duration=7200)[0] is True
+
+        assert make_an_appointment(**data, duration=7200)[0] is False
+        assert make_an_appointment(**{**data, "time": _date + timedelta(hours=1)})[0] is True
+
+        appointments = get_all_appointments(date=_date, workman_id=workman_id)
+        assert [a.datetime_begin for a in appointments if a.is_occupied] == [_date, _date + timedelta(hours=1)]
+
+    @pytest.mark.django_db
+    def test_time_validity(self):
+        self.generate_data()
+
+        _date = make_aware(datetime(2020, 8, 5, 9), pytz.UTC)
+        communicator = AppointmentsModelCommunicator(workman_id=self.workmans[3].id)
+
+        def is_valid(hours, duration=3600):
+            return communicator._check_if_time_valid(_date + timedelta(hours=hours), duration)[0] is False
+
+        assert is_valid(0) and is_valid(4) and is_valid(6) and is_valid(8) and is_valid(3, 3600 * 2)
+        assert not is_valid(-1) and not is_valid(0.5) and not is_valid(5) and not is_valid(9)
+        assert not is_valid(8, 3600 * 2) and not is_valid(0, 1800)
+
+        # computed from the cached schedule: a single lookup of the workman regime per check
+        communicator = AppointmentsModelCommunicator(workman_id=self.workmans[3].id)
+        with CaptureQueriesContext(connection) as ctx:
+            assert is_valid(4)
+        assert len(ctx.captured_queries) == 1
+
+    @pytest.mark.django_db
+    def test_create_on_day_without_schedule(self):
+        self.generate_data()
+
+        _date = make_aware(datetime(2020, 8, 5, 11), pytz.UTC)
+        WorkRegimeDetail.objects.filter(work_regime=self.work_regime, day_of_week=_date.weekday()).delete()
+
+        data = {
+            "time": _date,
+            "workman_id": self.workmans[3].id,
+            "user_id": self.user.id
+        }
+
+        assert make_an_appointment(**data) == (True, _("Chosen time is not valid"))
+        assert make_an_appointment(**data, duration=3600) == (True, _("Chosen time is not valid"))
+        assert not Appointments.objects.filter(workman_id=data["workman_id"], time=_date).exists()
+
+    @pytest.mark.django_db
+    def test_individual_work_regime(self, settings):
+        settings.OCCUPANCY_INDEX = True
+        self.generate_data()
+
+        # half-hour slots for a single workman
+        work_regime = generate_work_regime(self.repair_shop)
+        generate_work_regime_details(work_regime)
+        WorkRegimeDetail.objects.filter(work_regime=work_regime).update(appointment_duration=1800)
+        workman = self.workmans[3]
+        workman.individual_work_regime = work_regime
+        workman.save()
+
+        _date = make_aware(datetime(2020, 8, 5, 9), pytz.UTC)
+        data = {
+            "workman_id": workman.id,
+            "user_id": self.user.id
+        }
+
+        assert make_an_appointment(time=_date, duration=3600, **data)[0] is False
+        assert Appointments.objects.get(workman_id=workman.id, time=_date).work_regime_id == work_regime.id
+
+        # the bitmap of the individual grid has 9:30 occupied by the hour-long appointment
+        assert make_an_appointment(time=_date + timedelta(minutes=30), **data) == (
+            True, _("Chosen time is not available")
+        )
+        assert make_an_appointment(time=_date + timedelta(hours=1), **data)[0] is False
+
+        occupied = get_occupied_appointments(date=_date, workman_id=workman.id)
+        assert [a.datetime_begin for a in occupied] == [_date + timedelta(minutes=30 * n) for n in range(3)]
+
+    @pytest.mark.django_db
+    def test_unique_active_appointment(self):
+        self.generate_data()
+
+        _date = make_aware(datetime(2020, 8, 5, 10), pytz.UTC)
+        data = {
+            "time": _date,
+            "workman_id": self.workmans[3].id,
+            "user_id": self.user.id,
+        }
+        assert make_an_appointment(**data)[0] is False
+
+        # the check passed in another request which inserted first
+        with mock.patch.object(AppointmentsModelCommunicator, "_check_time", return_value=(False, None)):
+            assert make_an_appointment(**data) == (True, _("Chosen time is not available"))
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Appointments.objects.create(
+                date=_date.date(), time=_date, duration=3600, workman_id=self.workmans[3].id,
+                customer_id=self.user.id, work_regime=self.work_regime,
+            )
+
+        # the slot can be booked again once the appointment is deleted
+        assert delete_an_appointment(**data)[0] is False
+        assert make_an_appointment(**data)[0] is False
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_bookings(self):
+        self.generate_data()
+
+        data = {
+            "time": make_aware(datetime(2020, 8, 5, 10), pytz.UTC),
+            "workman_id": self.workmans[3].id,
+            "user_id": self.user.id,
+        }
+        threads_count = 8
+        barrier = threading.Barrier(threads_count)
+        # the shared in-memory sqlite of the tests refuses concurrent writers, the requests are serialised
+        # here and the refused lock is checked in test_database_is_locked
+        write_lock = threading.Lock()
+        results = []
+
+        def book():
+            try:
+                barrier.wait()
+                with write_lock:
+                    results.append(make_an_appointment(**data)[0])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results) == [False] + [True] * (threads_count - 1)
+        assert Appointments.objects.filter(workman_id=data["workman_id"], time=data["time"]).count() == 1
+
+    @pytest.mark.django_db
+    def test_database_is_locked(self):
+        self.generate_data()
+
+        data = {
+            "time": make_aware(datetime(2020, 8, 5, 10), pytz.UTC),
+            "workman_id": self.workmans[3].id,
+            "user_id": self.user.id,
+        }
+        busy = (True, _("Appointment service is busy, try again later"))
+        locked = mock.patch.object(AppointmentsModelCommunicator, "_lock_workman",
+                                   side_effect=OperationalError("database is locked"))
+
+        with locked:
+            assert make_an_appointment(**data) == busy
+        assert not Appointments.objects.filter(workman_id=data["workman_id"]).exists()
+
+        # the retry goes through
+        assert make_an_appointment(**data)[0] is False
+
+        new_time = data["time"] + timedelta(hours=1)
+        with locked:
+            assert move_an_appointment(**data, new_time=new_time) == busy
+        assert Appointments.objects.filter(workman_id=data["workman_id"], time=data["time"]).exists()
+
+    @pytest.mark.django_db
+    def test_booking_queries(self):
+        self.generate_data()
+
+        _date = make_aware(datetime(2020, 8, 5, 11), pytz.UTC)
+        data = {
+            "workman_id": self.workmans[3].id,
+            "user_id": self.user.id,
+        }
+
+        def queries(ctx):
+            return [q["sql"] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+
+        make_an_appointment(time=_date, **data)  # compiles and caches the schedule
+
+        # workman with his regimes, workman lock, booked intervals, insert
+        with CaptureQueriesContext(connection) as ctx:
+            assert make_an_appointment(time=_date + timedelta(hours=1), **data)[0] is False
+        assert len(queries(ctx)) == 4
+
+        def list_and_book(hours):
+            with CaptureQueriesContext(connection) as ctx:
+                get_all_appointments(date=_date, workman_id=data["workman_id"])
+                assert make_an_appointment(time=_date + timedelta(hours=hours), **data)[0] is False
+            return len(queries(ctx))
+
+        # within a request the processor and the booking share the workman of the identity map
+        without_scope = list_and_book(4)
+        with request_scope():
+            assert list_and_book(5) == without_scope - 1
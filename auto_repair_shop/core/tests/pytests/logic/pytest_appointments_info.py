@@ -1,9 +1,20 @@
 
+from collections.abc import Iterator
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from core.logic.appointments_info import (get_all_appointments,
+from core.logic.appointments_actions import make_an_appointment
+from core.logic.appointments_info import (AppointmentInfoList,
+                                          AppointmentTotalInfo,
+                                          get_all_appointments,
                                           get_available_appointments,
-                                          get_occupied_appointments)
+                                          get_occupied_appointments,
+                                          iter_appointments,
+                                          iter_available_appointments)
+from core.logic.request_scope import request_scope
+from core.models.work_regime import WorkRegimeDetail
 from core.tests.pytests.data_generators import SimpleTestDataGenerator
 
 
@@ -123,3 +134,132 @@ class TestAppointmentsProcessors(SimpleTestDataGenerator):
         assert len(res1) == 8 * 6 - 3
         assert len(res2) == 2 * 6
         assert len(res3) == 6 * 6 - 3
+
+    @pytest.mark.django_db
+    def test_query_count_does_not_depend_on_slots_count(self):
+        self.generate_data()
+
+        data = {
+            "date": self._datetime,
+            "workman_id": self.workmans[0].id
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            hourly = get_all_appointments(**data)
+
+        for wrd in WorkRegimeDetail.objects.filter(work_regime=self.work_regime):
+            wrd.appointment_duration = 900
+            wrd.save()
+
+        with CaptureQueriesContext(connection) as ctx_quarterly:
+            quarterly = get_all_appointments(**data)
+
+        assert len(quarterly) == 4 * len(hourly)
+        assert len(ctx_quarterly.captured_queries) == len(ctx.captured_queries)
+
+    @pytest.mark.django_db
+    def test_work_regime_lookups_are_cached(self):
+        self.generate_data()
+
+        data = {
+            "date": self._datetime,
+            "repair_shop_id": self.repair_shop.id
+        }
+
+        get_all_appointments(**data)
+        self.work_regime.get_wrd(self._datetime.date())
+
+        with CaptureQueriesContext(connection) as ctx:
+            get_all_appointments(**data)
+            wrd = self.work_regime.get_wrd(self._datetime.date())
+
+        assert not any("core_workregimedetail" in q["sql"] for q in ctx.captured_queries)
+
+        # the cached instance is not shared with the callers
+        wrd.appointment_duration = 900
+        assert self.work_regime.get_wrd(self._datetime.date()).appointment_duration == 3600
+
+        wrd.appointment_duration = 1800
+        wrd.save()
+
+        assert self.work_regime.get_wrd(self._datetime.date()).appointment_duration == 1800
+        assert len(get_all_appointments(**data)) == 5 * 16
+
+    @pytest.mark.django_db
+    def test_iter_appointments(self):
+        self.generate_data(is_range=True)
+
+        data = {
+            "datetime_begin": self._datetime,
+            "datetime_end": self._datetime_end,
+            "repair_shop_id": self.repair_shop.id
+        }
+
+        stream = iter_appointments(**data)
+
+        assert isinstance(stream, Iterator)
+        assert list(stream) == get_all_appointments(**data)
+        assert list(iter_available_appointments(**data)) == get_available_appointments(**data)
+
+    @pytest.mark.django_db
+    def test_request_scope_memo(self):
+        self.generate_data()
+
+        data = {
+            "date": self._datetime,
+            "workman_id": self.workmans[0].id
+        }
+
+        with request_scope():
+            available = get_available_appointments(**data)
+
+            with CaptureQueriesContext(connection) as ctx:
+                occupied = get_occupied_appointments(**data)
+                all_appointments = get_all_appointments(**data)
+
+            assert len(ctx.captured_queries) == 0
+            assert len(all_appointments) == len(available) + len(occupied)
+
+            is_err, _ = make_an_appointment(time=available[0].datetime_begin,
+                                            workman_id=self.workmans[0].id, user_id=self.user.id)
+
+            assert is_err is False
+            assert len(get_available_appointments(**data)) == len(available) - 1
+
+        info = AppointmentTotalInfo(counts_only=True, **data)
+        assert (info.total_cnt, info.occupied_cnt, info.appointments) == (8, 7, [])
+
+    @pytest.mark.django_db
+    def test_compact_appointments_list(self):
+        self.generate_data(is_range=True)
+
+        data = {
+            "datetime_begin": self._datetime,
+            "datetime_end": self._datetime_end,
+        }
+
+        appointments = list(iter_appointments(**data))
+        compact = AppointmentInfoList(appointments)
+
+        assert len(compact) == len(appointments)
+        assert list(compact) == appointments
+        assert compact[-1] == appointments[-1]
+        assert [a.is_occupied for a in compact] == [a.is_occupied for a in appointments]
+        assert compact.nbytes <= 21 * len(compact)
+        assert not hasattr(appointments[0], "__dict__")
+
+        occupied = [a for a in appointments if a.is_occupied]
+        assert list(compact.select(is_occupied=True)) == occupied
+        assert compact.select(is_occupied=True)[-1] == occupied[-1]
+        assert compact.select(is_occupied=False) == [a for a in appointments if not a.is_occupied]
+
+    @pytest.mark.django_db
+    def test_slots_are_stored_once(self):
+        self.generate_data()
+
+        info = AppointmentTotalInfo(date=self._datetime)
+
+        assert len(info.get_available_appointments()) + len(info.get_occupied_appointments()) == info.total_cnt
+        assert info.get_available_appointments().appointments is info.appointments
+        assert info.get_occupied_appointments().appointments is info.appointments
+        assert len(info.get_available_appointments()) == info.available_cnt
@@ -0,0 +1,69 @@
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.logic.appointments_info import iter_available_appointments
+from core.logic.batch import KIND_WORKLOAD, run_batch
+from core.logic.custom_exceptions import ProcessorNotFound
+from core.logic.workload import get_workload
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+
+class TestBatchQuery(SimpleTestDataGenerator):
+
+    def _specs(self):
+        data = {
+            "datetime_begin": self._datetime + timedelta(minutes=30),
+            "datetime_end": self._datetime_end,
+        }
+        return [
+            {"date": self._datetime, "repair_shop_id": self.repair_shop.id},
+            {**data, "workman_id": self.workmans[0].id},
+            {**data, "workman_id": self.workmans[1].id, "kind": KIND_WORKLOAD},
+            {**data, "repair_shop_id": self.repair_shop.id, "kind": KIND_WORKLOAD},
+            {"date": self._datetime, "kind": KIND_WORKLOAD},
+        ]
+
+    @pytest.mark.django_db
+    def test_same_results_as_single_queries(self):
+        self.generate_data(is_range=True)
+
+        specs = self._specs()
+        expected = []
+        for spec in specs:
+            spec = dict(spec)
+            if spec.pop("kind", None) == KIND_WORKLOAD:
+                expected.append(get_workload(**spec))
+            else:
+                expected.append(list(iter_available_appointments(**spec)))
+
+        items = run_batch(specs)
+        assert [item.result for item in items] == expected
+
+    @pytest.mark.django_db
+    def test_shared_prefetch(self):
+        self.generate_data(is_range=True)
+
+        with CaptureQueriesContext(connection) as ctx:
+            items = run_batch(self._specs() * 4)
+        assert all(item.error is None for item in items)
+
+        def count(table):
+            return sum(f'FROM "{table}"' in q["sql"] for q in ctx.captured_queries)
+
+        assert count("core_appointments") == 1
+        assert count("core_workregimedetail") == 1
+        assert count("core_workman") <= len(items)  # shop targets only, slots never query workmen
+
+    @pytest.mark.django_db
+    def test_wrong_specs(self):
+        self.generate_data()
+
+        items = run_batch([{"kind": "unknown", "date": self._datetime}, {}, {"date": self._datetime}])
+
+        assert items[0].error is not None
+        assert isinstance(items[1].error, ProcessorNotFound)
+        assert items[2].error is None and items[2].result
@@ -0,0 +1,97 @@
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from django.db import connection
+from django.utils.timezone import make_aware
+
+from core.logic.appointments_actions import (delete_an_appointment,
+                                             make_an_appointment)
+from core.logic.booking_queue import (BookingWriter, get_booking_writer,
+                                      stop_booking_writer)
+from core.models.workflow import Appointments
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+
+@pytest.fixture
+def booking_queue(settings):
+    settings.BOOKING_QUEUE = True
+    yield get_booking_writer()
+    stop_booking_writer()
+
+
+class TestBookingQueue(SimpleTestDataGenerator):
+
+    def _hammer(self, threads_count: int, get_args) -> list:
+        barrier = threading.Barrier(threads_count)
+        results = [None] * threads_count
+
+        def book(idx):
+            try:
+                barrier.wait()
+                results[idx] = make_an_appointment(**get_args(idx))[0]
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(idx,)) for idx in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    @pytest.mark.django_db(transaction=True)
+    def test_one_slot_from_many_threads(self, booking_queue):
+        self.generate_data()
+
+        data = {
+            "time": make_aware(datetime(2020, 8, 5, 10), pytz.UTC),
+            "workman_id": self.workmans[3].id,
+            "user_id": self.user.id,
+        }
+
+        # no "database is locked": every caller gets an answer
+        results = self._hammer(8, lambda idx: data)
+        assert sorted(results) == [False] + [True] * 7
+        assert Appointments.objects.filter(workman_id=data["workman_id"], time=data["time"]).count() == 1
+
+        assert delete_an_appointment(**data)[0] is False
+        assert not Appointments.objects.filter(workman_id=data["workman_id"], time=data["time"]).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_different_slots(self, booking_queue):
+        self.generate_data()
+
+        _date = make_aware(datetime(2020, 8, 5, 9), pytz.UTC)
+
+        # 11:00 and 12:00 are free for every workman
+        def get_args(idx):
+            return {
+                "time": _date + timedelta(hours=2 + idx % 2),
+                "workman_id": self.workmans[idx // 2].id,
+                "user_id": self.user.id,
+            }
+
+        results = self._hammer(8, get_args)
+        assert results == [False] * 8
+        assert Appointments.objects.filter(
+            time__gte=_date + timedelta(hours=2), time__lt=_date + timedelta(hours=4)
+        ).count() == 8
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_command_does_not_break_batch():
+    writer = BookingWriter()
+
+    def fail():
+        raise ValueError("wrong command")
+
+    try:
+        futures = [writer.submit(fail), writer.submit(lambda a, b: a + b, 1, 2)]
+        with pytest.raises(ValueError):
+            futures[0].result(timeout=5)
+        assert futures[1].result(timeout=5) == 3
+    finally:
+        writer.stop()
@@ -0,0 +1,148 @@
+
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy as _
+
+from core.logic.appointments_actions import make_an_appointment
+from core.logic.bulk_appointments import (BulkAppointmentsCommunicator,
+                                          delete_appointments,
+                                          make_appointments,
+                                          move_appointments)
+from core.models.workflow import Appointments
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+from core.tests.pytests.model_fillers.structure import (
+    generate_work_regime, generate_work_regime_details)
+
+
+class TestBulkAppointments(SimpleTestDataGenerator):
+
+    def _item(self, workman_idx: int, hours: float, **kw) -> dict:
+        # 11:00 and 12:00 are free for every workman
+        return {"time": self._datetime + timedelta(hours=hours), "workman_id": self.workmans[workman_idx].id, **kw}
+
+    def _booked(self, item: dict) -> bool:
+        return Appointments.objects.filter(workman_id=item["workman_id"], time=item["time"]).exists()
+
+    @pytest.mark.django_db
+    def test_create(self):
+        self.generate_data()
+
+        items = [
+            self._item(0, 2),
+            self._item(0, 3),
+            self._item(1, 2, duration=7200),
+            self._item(2, 2),
+            self._item(2, 2),  # taken by the previous item
+            self._item(2, 0),  # booked already
+            self._item(3, 2.5),  # not on the grid
+            {"workman_id": self.workmans[3].id},
+        ]
+        results = make_appointments(items, user_id=self.user.id)
+
+        assert [is_error for is_error, _ in results] == [False, False, False, False, True, True, True, True]
+        assert all(self._booked(item) for item in items[:4])
+        assert Appointments.objects.get(workman_id=items[2]["workman_id"], time=items[2]["time"]).duration == 7200
+        assert make_an_appointment(**self._item(1, 3), user_id=self.user.id)[0] is True
+
+    @pytest.mark.django_db
+    def test_individual_work_regime(self):
+        self.generate_data()
+
+        work_regime = generate_work_regime(self.repair_shop)
+        generate_work_regime_details(work_regime)
+        workman = self.workmans[3]
+        workman.individual_work_regime = work_regime
+        workman.save()
+
+        items = [self._item(3, 2), self._item(2, 2)]
+        assert [is_error for is_error, _ in make_appointments(items, user_id=self.user.id)] == [False, False]
+
+        # stored with the regime the slots are generated by, as make_an_appointment does
+        assert Appointments.objects.get(workman_id=workman.id).work_regime_id == work_regime.id
+        assert Appointments.objects.get(**items[1]).work_regime_id == self.work_regime.id
+
+    @pytest.mark.django_db
+    def test_queries_do_not_grow_with_batch(self):
+        self.generate_data()
+
+        def count_queries(items):
+            with CaptureQueriesContext(connection) as ctx:
+                make_appointments(items, user_id=self.user.id)
+            return len(ctx.captured_queries)
+
+        count_queries([self._item(0, 2)])  # compiles and caches the schedule
+
+        one = count_queries([self._item(1, 2)])
+        several = count_queries([self._item(idx, hours) for idx in (2, 3) for hours in (2, 3)] + [self._item(1, 3)])
+        assert several == one
+
+    @pytest.mark.django_db
+    def test_concurrent_insert(self):
+        self.generate_data()
+
+        items = [self._item(0, 2), self._item(1, 2)]
+        snapshot = BulkAppointmentsCommunicator._get_snapshot
+
+        def get_snapshot(*args, **kw):
+            # another request books the slot after the snapshot has been read
+            res = snapshot(*args, **kw)
+            Appointments.objects.create(
+                customer_id=self.user.id, workman_id=items[1]["workman_id"], date=items[1]["time"].date(),
+                time=items[1]["time"], work_regime=self.work_regime, duration=3600,
+            )
+            return res
+
+        with mock.patch.object(BulkAppointmentsCommunicator, "_get_snapshot", staticmethod(get_snapshot)):
+            results = make_appointments(items, user_id=self.user.id)
+
+        assert [is_error for is_error, _ in results] == [False, True]
+        assert Appointments.objects.filter(workman_id=items[1]["workman_id"], time=items[1]["time"]).count() == 1
+
+    @pytest.mark.django_db
+    def test_move_and_delete(self):
+        self.generate_data()
+
+        make_appointments([self._item(0, 2), self._item(1, 2)], user_id=self.user.id)
+
+        moves = [
+            self._item(0, 2, new_time=self._datetime + timedelta(hours=3)),
+            self._item(1, 2, new_time=self._datetime),  # booked already
+            self._item(2, 2, new_time=self._datetime + timedelta(hours=3)),  # no appointment
+        ]
+        results = move_appointments(moves, user_id=self.user.id)
+
+        assert [is_error for is_error, _ in results] == [False, True, True]
+        assert not self._booked(self._item(0, 2)) and self._booked(self._item(0, 3))
+        assert self._booked(self._item(1, 2))
+
+        results = delete_appointments([self._item(0, 3), self._item(1, 2), self._item(1, 2)], user_id=self.user.id)
+
+        assert [is_error for is_error, _ in results] == [False, False, True]
+        assert not self._booked(self._item(0, 3)) and not self._booked(self._item(1, 2))
+
+    @pytest.mark.django_db
+    def test_string_ids_and_locks(self):
+        self.generate_data()
+
+        def as_strings(item: dict) -> dict:
+            return {**item, "workman_id": str(item["workman_id"])}
+
+        make_appointments([as_strings(self._item(0, 2))], user_id=self.user.id)
+        assert self._booked(self._item(0, 2))
+
+        with mock.patch("core.logic.bulk_appointments.lock_workmen") as lock:
+            results = move_appointments([as_strings(self._item(0, 2, new_time=self._datetime + timedelta(hours=3)))],
+                                        user_id=str(self.user.id))
+            assert results == [(False, _("Success"))]
+            lock.assert_called_once_with({self.workmans[0].id})
+
+        with mock.patch("core.logic.bulk_appointments.lock_workmen") as lock:
+            results = delete_appointments([as_strings(self._item(0, 3))], user_id=self.user.id)
+            assert results == [(False, _("Success"))]
+            lock.assert_called_once_with({self.workmans[0].id})
+
+        assert not self._booked(self._item(0, 2)) and not self._booked(self._item(0, 3))
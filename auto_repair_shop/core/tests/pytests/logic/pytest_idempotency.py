@@ -0,0 +1,115 @@
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from core.logic import idempotency
+from core.logic.idempotency import get_request_hash, run_idempotent
+from core.models.user import User
+from core.models.workflow import IdempotencyKey
+from core.tests.pytests.model_fillers.structure import generate_user
+
+
+class TestIdempotency(object):
+
+    @pytest.mark.django_db
+    def test_replays(self):
+        user = generate_user()
+        calls = []
+
+        def func():
+            calls.append(1)
+            return {"is_error": False, "info": f"call {len(calls)}"}
+
+        def run(key, data=None):
+            return run_idempotent(user.id, "make_appointment", key, data or {"time": "2020-08-05 11:00"}, func)
+
+        assert run("a") == {"is_error": False, "info": "call 1"}
+        assert run("a") == {"is_error": False, "info": "call 1"}
+        assert run("b")["info"] == "call 2"
+        assert run("")["info"] == "call 3"  # no key, no replay
+        assert run("a", {"time": "2020-08-05 12:00"})["is_error"]
+        assert len(calls) == 3
+
+        # an expired key is claimed again, the request runs again
+        IdempotencyKey.objects.update(created=timezone.now() - timedelta(days=2))
+        assert run("a")["info"] == "call 4"
+        assert IdempotencyKey.objects.count() == 2
+
+        out = StringIO()
+        call_command("purge_idempotency_keys", stdout=out)
+        assert "Deleted 1 " in out.getvalue()
+        assert list(IdempotencyKey.objects.values_list("key", flat=True)) == ["a"]
+
+    @pytest.mark.django_db
+    def test_in_progress_and_failures(self):
+        user = generate_user()
+
+        def nested():
+            # the same key while the first request is still running
+            return run_idempotent(user.id, "make_appointment", "a", {}, lambda: {"is_error": False})
+
+        assert run_idempotent(user.id, "make_appointment", "a", {}, nested)["is_error"]
+
+        def fail():
+            raise ValueError
+
+        with pytest.raises(ValueError):
+            run_idempotent(user.id, "make_appointment", "b", {}, fail)
+        assert run_idempotent(user.id, "make_appointment", "b", {}, lambda: {"is_error": False}) == {"is_error": False}
+
+    @pytest.mark.django_db
+    def test_stale_pending_key(self):
+        user = generate_user()
+        data = {"time": "2020-08-05 11:00"}
+
+        def run():
+            return run_idempotent(user.id, "make_appointment", "a", data, lambda: {"is_error": False})
+
+        # the first request died after claiming the key
+        IdempotencyKey.objects.create(customer=user, endpoint="make_appointment", key="a",
+                                      request_hash=get_request_hash(data))
+        assert run()["is_error"]
+
+        IdempotencyKey.objects.update(created=timezone.now() - timedelta(minutes=2))
+        assert run() == {"is_error": False}
+        assert IdempotencyKey.objects.get().response == {"is_error": False}
+
+    @pytest.mark.django_db
+    def test_purge_is_throttled(self, settings, monkeypatch):
+        user = generate_user()
+        monkeypatch.setattr(idempotency, "_last_purge", None)
+        settings.IDEMPOTENCY_KEY_PURGE_INTERVAL = 60
+
+        def expire_and_run(key):
+            IdempotencyKey.objects.update(created=timezone.now() - timedelta(days=2))
+            run_idempotent(user.id, "make_appointment", key, {}, lambda: {"is_error": False})
+            return sorted(IdempotencyKey.objects.values_list("key", flat=True))
+
+        run_idempotent(user.id, "make_appointment", "a", {}, lambda: {"is_error": False})
+        # purged a moment ago by the first request, the expired key is kept until the next interval
+        assert expire_and_run("b") == ["a", "b"]
+
+        monkeypatch.setattr(idempotency, "_last_purge", None)
+        assert expire_and_run("c") == ["c"]
+
+        monkeypatch.setattr(idempotency, "_last_purge", None)
+        settings.IDEMPOTENCY_KEY_PURGE_INTERVAL = 0
+        assert expire_and_run("d") == ["c", "d"]
+
+    @pytest.mark.django_db
+    def test_keys_per_customer_are_bounded(self, settings):
+        user = generate_user()
+        other = User.objects.create_user("Other", username="Other")
+        settings.IDEMPOTENCY_KEY_MAX_PER_CUSTOMER = 3
+
+        for customer in (other, user):
+            for key in "abcde":
+                run_idempotent(customer.id, "make_appointment", key, {}, lambda: {"is_error": False})
+
+        for customer in (other, user):
+            keys = IdempotencyKey.objects.filter(customer=customer).values_list("key", flat=True)
+            assert sorted(keys) == ["c", "d", "e"]
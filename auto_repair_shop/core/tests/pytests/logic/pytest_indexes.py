@@ -0,0 +1,86 @@
+
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.logic.appointments_actions import (delete_an_appointment,
+                                             make_an_appointment)
+from core.logic.appointments_info import get_all_appointments
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+pytestmark = pytest.mark.skipif(connection.vendor != "sqlite", reason="EXPLAIN QUERY PLAN is sqlite specific")
+
+INDEXES = {
+    "core_appointments": {"appointments_workman", "appointments_regime", "unique_active_appointment"},
+    "core_appointmentsarchive": {"appointmentsarchive_workman", "appointmentsarchive_regime"},
+}
+
+
+def get_plans(queries, table: str) -> list:
+    """
+        Query plan lines of the captured selects reading the table.
+    """
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries:
+            if not query["sql"].startswith("SELECT") or f'FROM "{table}"' not in query["sql"]:
+                continue
+            cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+            plans += [row[-1] for row in cursor.fetchall() if re.search(rf"\b{table}\b", row[-1])]
+    return plans
+
+
+def assert_uses_indexes(queries, table: str):
+    plans = get_plans(queries, table)
+    assert plans
+
+    for plan in plans:
+        match = re.match(rf"SEARCH {table} USING (?:COVERING )?INDEX (\w+)", plan)
+        assert match and match.group(1) in INDEXES[table], plan
+
+
+class TestAppointmentsIndexes(SimpleTestDataGenerator):
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("from_archive, table", [
+        (False, "core_appointments"),
+        (True, "core_appointmentsarchive"),
+    ])
+    @pytest.mark.parametrize("target", ["workman_id", "repair_shop_id"])
+    @pytest.mark.parametrize("is_range", [False, True])
+    def test_processors(self, from_archive, table, target, is_range):
+        self.generate_data()
+
+        data = {
+            "workman_id": self.workmans[0].id,
+            "repair_shop_id": self.repair_shop.id,
+        }
+        data = {target: data[target], "from_archive": from_archive}
+        if is_range:
+            data.update(datetime_begin=self._datetime, datetime_end=self._datetime_end)
+        else:
+            data.update(date=self._datetime)
+
+        with CaptureQueriesContext(connection) as ctx:
+            get_all_appointments(**data)
+
+        assert_uses_indexes(ctx.captured_queries, table)
+
+    @pytest.mark.django_db
+    def test_actions(self):
+        self.generate_data()
+
+        # 11:00 is free for every workman
+        data = {
+            "time": self._datetime.replace(hour=11),
+            "workman_id": self.workmans[0].id,
+            "user_id": self.user.id,
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert make_an_appointment(**data)[0] is False
+            assert delete_an_appointment(**data)[0] is False
+
+        assert_uses_indexes(ctx.captured_queries, "core_appointments")
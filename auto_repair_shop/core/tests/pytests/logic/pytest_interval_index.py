@@ -0,0 +1,42 @@
+
+from datetime import datetime
+
+import pytz
+from django.utils.timezone import make_aware
+
+from core.logic.interval_index import IntervalIndex, WorkmenIntervals
+
+
+def _utc(*args):
+    return make_aware(datetime(2020, 8, 5, *args), pytz.UTC)
+
+
+class TestIntervalIndex(object):
+
+    def test_overlaps(self):
+        index = IntervalIndex([(_utc(9), 3 * 3600), (_utc(10), 3600), (_utc(15), 3600)])
+
+        assert index.overlaps(_utc(11), _utc(12))  # covered by the long 9:00 interval only
+        assert index.overlaps(_utc(8, 30), _utc(9, 30))
+        assert index.overlaps(_utc(15, 59), _utc(17))
+        assert not index.overlaps(_utc(12), _utc(15))  # borders are not an overlap
+        assert not index.overlaps(_utc(16), _utc(17))
+        assert not IntervalIndex().overlaps(_utc(9), _utc(10))
+
+    def test_iter_overlapping(self):
+        index = IntervalIndex([(_utc(9), 3 * 3600), (_utc(10), 3600), (_utc(13), 3600), (_utc(15), 3600)])
+
+        assert list(index.iter_overlapping(_utc(11), _utc(14))) == [(_utc(9), _utc(12)), (_utc(13), _utc(14))]
+        assert list(index.iter_overlapping(_utc(12), _utc(13))) == []
+        assert list(index.iter_overlapping(_utc(15, 30), _utc(20))) == [(_utc(15), _utc(16))]
+        assert list(IntervalIndex().iter_overlapping(_utc(9), _utc(10))) == []
+
+    def test_workmen_intervals(self):
+        intervals = WorkmenIntervals([(1, _utc(9), 7200), (2, _utc(12), 3600)])
+
+        assert intervals.overlaps(1, _utc(10), _utc(11))
+        assert not intervals.overlaps(2, _utc(10), _utc(11))
+        assert not intervals.overlaps(3, _utc(12), _utc(13))
+
+        subset = intervals.subset([2, 3])
+        assert list(subset.iter_intervals()) == [(2, _utc(12), _utc(13))]
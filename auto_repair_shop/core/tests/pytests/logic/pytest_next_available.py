@@ -0,0 +1,49 @@
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.logic.appointments_info import iter_available_appointments
+from core.logic.custom_exceptions import ProcessorNotFound
+from core.logic.next_available import find_next_available
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+
+class TestFindNextAvailable(SimpleTestDataGenerator):
+
+    def _expected(self, limit, **args):
+        appointments = iter_available_appointments(
+            datetime_begin=self._datetime,
+            datetime_end=self._datetime_end,
+            **args
+        )
+        return sorted(appointments, key=lambda a: (a.datetime_begin, a.workman_id))[:limit]
+
+    @pytest.mark.django_db
+    def test_same_as_processors(self):
+        self.generate_data(is_range=True)
+
+        shop = {"repair_shop_id": self.repair_shop.id}
+        workman = {"workman_id": self.workmans[0].id}
+
+        assert find_next_available(after=self._datetime, limit=20, **shop) == self._expected(20, **shop)
+        assert find_next_available(after=self._datetime, limit=10, **workman) == self._expected(10, **workman)
+
+    @pytest.mark.django_db
+    def test_early_termination(self):
+        self.generate_data(is_range=True)
+
+        with CaptureQueriesContext(connection) as ctx:
+            first = find_next_available(workman_id=self.workmans[0].id, after=self._datetime)
+        assert first[0].datetime_begin == self._datetime + timedelta(hours=2)
+
+        # targets, workmen and a single chunk of appointments
+        appointments_queries = [q for q in ctx.captured_queries if "core_appointments" in q["sql"]]
+        assert len(appointments_queries) == 1
+
+    @pytest.mark.django_db
+    def test_wrong_arguments(self):
+        with pytest.raises(ProcessorNotFound):
+            find_next_available(after=None)
@@ -0,0 +1,89 @@
+
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.logic.appointments_actions import (delete_an_appointment,
+                                             make_an_appointment,
+                                             move_an_appointment)
+from core.logic.appointments_info import get_all_appointments
+from core.logic.occupancy_index import occupancy_index, popcount
+from core.logic.workload import get_workload
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+
+class TestOccupancyIndex(SimpleTestDataGenerator):
+
+    @pytest.mark.django_db
+    def test_same_results_as_db(self, settings):
+        self.generate_data(is_range=True)
+
+        data = {
+            "datetime_begin": self._datetime,
+            "datetime_end": self._datetime_end,
+            "repair_shop_id": self.repair_shop.id
+        }
+
+        expected = list(get_all_appointments(**data))
+        expected_workload = get_workload(**data)
+
+        settings.OCCUPANCY_INDEX = True
+
+        assert list(get_all_appointments(**data)) == expected
+        assert get_workload(**data) == expected_workload
+
+    @pytest.mark.django_db
+    def test_archive_is_not_indexed(self, settings):
+        settings.OCCUPANCY_INDEX = True
+        self.generate_data()
+
+        data = {
+            "date": self._datetime,
+            "workman_id": self.workmans[0].id,
+        }
+        assert get_workload(**data).occupied == 6
+
+        # no archived appointments, the live ones must not leak into the archive view
+        data["from_archive"] = True
+        assert not any(appointment.is_occupied for appointment in get_all_appointments(**data))
+        assert get_workload(**data).occupied == 0
+
+    @pytest.mark.django_db
+    def test_bookings_update_bitmap(self, settings):
+        settings.OCCUPANCY_INDEX = True
+        self.generate_data()
+
+        workman = self.workmans[0]
+        _date = self._datetime.date()
+        bitmap = occupancy_index.get_bitmap(workman.id, self.work_regime, _date)
+        assert popcount(bitmap) == 6
+
+        # 11:00 and 12:00 are the free slots of the day
+        _time = self._datetime + timedelta(hours=2)
+        new_time = self._datetime + timedelta(hours=3)
+        free_bitmap = occupancy_index.get_free_bitmap(workman.id, self.work_regime, _date)
+        assert free_bitmap == 0b1100
+
+        data = {
+            "time": _time,
+            "workman_id": workman.id,
+            "user_id": self.user.id
+        }
+
+        assert make_an_appointment(**data)[0] is False
+        assert make_an_appointment(**data)[0] is True
+        assert occupancy_index.is_occupied(workman.id, self.work_regime, _time)
+
+        with CaptureQueriesContext(connection) as ctx:
+            bitmap = occupancy_index.get_bitmap(workman.id, self.work_regime, _date)
+        assert popcount(bitmap) == 7
+        assert len(ctx.captured_queries) == 0
+
+        assert move_an_appointment(new_time=new_time, **data)[0] is False
+        assert not occupancy_index.is_occupied(workman.id, self.work_regime, _time)
+        assert occupancy_index.is_occupied(workman.id, self.work_regime, new_time)
+
+        assert delete_an_appointment(**{**data, "time": new_time})[0] is False
+        assert popcount(occupancy_index.get_bitmap(workman.id, self.work_regime, _date)) == 6
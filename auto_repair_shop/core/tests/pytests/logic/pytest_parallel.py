@@ -0,0 +1,38 @@
+
+import pytest
+
+from core.logic.appointments_info import iter_appointments
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+
+class TestParallelProcessing(SimpleTestDataGenerator):
+
+    def _collect(self, settings, executor):
+        settings.APPOINTMENTS_EXECUTOR = executor
+        settings.APPOINTMENTS_EXECUTOR_WORKERS = 2
+        settings.APPOINTMENTS_EXECUTOR_DAYS_CHUNK = 2
+
+        data = {
+            "datetime_begin": self._datetime,
+            "datetime_end": self._datetime_end,
+        }
+        return list(iter_appointments(**data))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_thread_executor(self, settings):
+        self.generate_data(is_range=True)
+
+        serial = self._collect(settings, None)
+        parallel = self._collect(settings, "thread")
+
+        assert len(serial) == 30 * 8 - 15
+        assert parallel == serial
+
+    @pytest.mark.django_db
+    def test_process_executor(self, settings):
+        self.generate_data(is_range=True)
+
+        serial = self._collect(settings, None)
+        parallel = self._collect(settings, "process")
+
+        assert parallel == serial
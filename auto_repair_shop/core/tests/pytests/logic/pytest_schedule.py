@@ -0,0 +1,99 @@
+
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import get_current_timezone, make_aware
+
+from core.logic.appointments_info import get_all_appointments
+from core.logic.schedule import WorkRegimeSchedule
+from core.logic.workload import get_workload
+from core.models.work_regime import WorkRegimeDetail, WorkRegimeExceptions
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+
+def _local(*args):
+    return make_aware(datetime(*args), get_current_timezone())
+
+
+class TestWorkRegimeSchedule(SimpleTestDataGenerator):
+
+    @pytest.mark.django_db
+    def test_lunch_is_removed(self):
+        self.generate_data()
+
+        schedule = WorkRegimeSchedule.compile(self.work_regime)
+        slots = schedule.project(date(2020, 8, 5))
+
+        assert len(slots) == 8
+        assert slots[0] == (_local(2020, 8, 5, 9), _local(2020, 8, 5, 10))
+        assert _local(2020, 8, 5, 14) not in [begin for begin, _ in slots]
+
+    @pytest.mark.django_db
+    def test_clipping(self):
+        self.generate_data()
+
+        schedule = WorkRegimeSchedule.compile(self.work_regime)
+
+        aligned = schedule.project(date(2020, 8, 5), _local(2020, 8, 5, 12), _local(2020, 8, 5, 16))
+        assert [begin.hour for begin, _ in aligned] == [12, 13, 15]
+
+        # the grid is not shifted by an unaligned border
+        unaligned = schedule.project(date(2020, 8, 5), _local(2020, 8, 5, 15, 30))
+        assert [begin.hour for begin, _ in unaligned] == [16, 17]
+        assert schedule.count(date(2020, 8, 5), _local(2020, 8, 5, 15, 30)) == 2
+
+    @pytest.mark.django_db
+    def test_shift_finish_on_next_day(self):
+        self.generate_data()
+
+        WorkRegimeDetail.objects.filter(work_regime=self.work_regime).update(
+            work_time_begin=time(hour=20),
+            work_time_end=time(hour=4),
+            lunch_time_begin=None,
+            lunch_time_end=None,
+            shift_finish_on_next_day=True,
+        )
+
+        schedule = WorkRegimeSchedule.compile(self.work_regime)
+        slots = schedule.project(date(2020, 8, 5))
+
+        assert len(slots) == 8
+        assert slots[-1][1] == _local(2020, 8, 5, 20) + timedelta(hours=8)
+
+    @pytest.mark.django_db
+    def test_exceptions(self):
+        self.generate_data()
+
+        WorkRegimeExceptions.objects.create(work_regime=self.work_regime, date=date(2020, 8, 6),
+                                            work_time_begin=time(hour=9), work_time_end=time(hour=18),
+                                            is_holiday=True)
+        WorkRegimeExceptions.objects.create(work_regime=self.work_regime, date=date(2020, 8, 7),
+                                            work_time_begin=time(hour=10), work_time_end=time(hour=13))
+
+        schedule = WorkRegimeSchedule.get(self.work_regime)
+
+        assert len(schedule.project(date(2020, 8, 5))) == 8
+        assert schedule.project(date(2020, 8, 6)) == []
+        assert [begin.hour for begin, _ in schedule.project(date(2020, 8, 7))] == [10, 11, 12]
+        assert self.work_regime.get_wrd(date(2020, 8, 7)).work_time_begin == time(hour=10)
+
+    @pytest.mark.django_db
+    def test_exceptions_without_per_day_queries(self):
+        self.generate_data()
+
+        begin = _local(2020, 1, 1)
+        for n in range(0, 366, 7):
+            WorkRegimeExceptions.objects.create(work_regime=self.work_regime, date=begin.date() + timedelta(days=n),
+                                                work_time_begin=time(hour=9), work_time_end=time(hour=18),
+                                                is_holiday=True)
+
+        data = {"datetime_begin": begin, "datetime_end": begin + timedelta(days=365), "workman_id": self.workmans[0].id}
+
+        with CaptureQueriesContext(connection) as ctx:
+            workload = get_workload(**data)
+        assert sum('FROM "core_workregimeexceptions"' in q["sql"] for q in ctx.captured_queries) == 1
+
+        assert workload.total == (365 - 53) * 8  # the last day ends at midnight
+        assert len(get_all_appointments(**data)) == workload.total
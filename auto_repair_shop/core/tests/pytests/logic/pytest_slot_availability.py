@@ -0,0 +1,94 @@
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.logic import slot_availability
+from core.logic.appointments_actions import (delete_an_appointment,
+                                             make_an_appointment)
+from core.logic.appointments_info import iter_available_appointments
+from core.models.workflow import SlotAvailability
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+
+def _slots(appointments):
+    return {(a.repair_shop_id, a.workman_id, a.datetime_begin, a.datetime_end) for a in appointments}
+
+
+class TestSlotAvailability(SimpleTestDataGenerator):
+
+    def _build(self):
+        return slot_availability.build_slots(self._datetime.date(), self._datetime_end.date())
+
+    @pytest.mark.django_db
+    def test_same_results_as_processors(self, settings):
+        self.generate_data(is_range=True)
+
+        data = {
+            "datetime_begin": self._datetime + timedelta(minutes=30),
+            "datetime_end": self._datetime_end,
+        }
+        variants = [
+            {"date": self._datetime},
+            data,
+            {**data, "repair_shop_id": self.repair_shop.id},
+            {**data, "workman_id": self.workmans[0].id},
+        ]
+        expected = [_slots(iter_available_appointments(**args)) for args in variants]
+
+        settings.SLOT_AVAILABILITY = True
+        assert self._build() == 6 * 8 * len(self.workmans)
+
+        for args, slots in zip(variants, expected):
+            with CaptureQueriesContext(connection) as ctx:
+                assert _slots(iter_available_appointments(**args)) == slots
+            assert not any("core_appointments" in q["sql"] for q in ctx.captured_queries)
+
+        # days out of the horizon are generated by the processors
+        out_of_horizon = {**data, "datetime_end": self._datetime_end + timedelta(days=1)}
+        assert len(_slots(iter_available_appointments(**out_of_horizon))) > len(expected[1])
+
+    @pytest.mark.django_db
+    def test_bookings_flip_slots(self, settings):
+        settings.SLOT_AVAILABILITY = True
+        self.generate_data()
+        self._build()
+
+        workman = self.workmans[3]
+        _time = self._datetime + timedelta(hours=2)
+        data = {
+            "time": _time,
+            "workman_id": workman.id,
+            "user_id": self.user.id,
+            "duration": 7200,
+        }
+
+        def is_free(time):
+            return SlotAvailability.objects.get(workman=workman, slot_begin=time).is_free
+
+        assert make_an_appointment(**data)[0] is False
+        assert not is_free(_time) and not is_free(_time + timedelta(hours=1))
+
+        assert delete_an_appointment(**data)[0] is False
+        assert is_free(_time) and is_free(_time + timedelta(hours=1))
+
+    @pytest.mark.django_db
+    def test_extend_command(self):
+        self.generate_data()
+        today = timezone.localdate()
+
+        out = StringIO()
+        call_command("extend_slot_availability", days=2, stdout=out)
+        call_command("extend_slot_availability", days=3, stdout=out)
+
+        dates = set(SlotAvailability.objects.values_list("date", flat=True))
+        assert dates == {today + timedelta(days=n) for n in range(3)}
+        assert SlotAvailability.objects.count() == 3 * 8 * len(self.workmans)
+
+        call_command("extend_slot_availability", days=1, rebuild=True, stdout=out)
+        assert set(SlotAvailability.objects.values_list("date", flat=True)) == {today}
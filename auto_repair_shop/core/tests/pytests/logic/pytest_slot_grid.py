@@ -0,0 +1,75 @@
+
+from datetime import time, timedelta
+from unittest import mock
+
+import pytest
+
+from core.logic.appointments_info import get_all_appointments
+from core.logic.workload import get_workload
+from core.models.work_regime import WorkRegimeExceptions
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+np = pytest.importorskip("numpy")
+
+from core.logic.slot_grid import SlotGrid, get_slot_grid  # noqa: E402
+
+
+class TestSlotGrid(SimpleTestDataGenerator):
+
+    def _assert_same_as_processors(self, data):
+        grid = get_slot_grid(**data)
+        appointments = get_all_appointments(**data)
+
+        assert list(grid.iter_appointments()) == appointments
+        assert grid.occupied_cnt == len([a for a in appointments if a.is_occupied])
+
+    @pytest.mark.django_db
+    def test_date(self):
+        self.generate_data()
+
+        self._assert_same_as_processors({"date": self._datetime})
+        self._assert_same_as_processors({"date": self._datetime, "repair_shop_id": self.repair_shop.id})
+        self._assert_same_as_processors({"date": self._datetime, "workman_id": self.workmans[0].id})
+
+    @pytest.mark.django_db
+    def test_date_range(self):
+        self.generate_data(is_range=True)
+
+        data = {
+            "datetime_begin": self._datetime + timedelta(minutes=30),
+            "datetime_end": self._datetime_end,
+        }
+
+        self._assert_same_as_processors(data)
+        self._assert_same_as_processors({**data, "repair_shop_id": self.repair_shop.id})
+        self._assert_same_as_processors({**data, "workman_id": self.workmans[0].id})
+
+    @pytest.mark.django_db
+    def test_as_arrays(self):
+        self.generate_data()
+
+        arrays = get_slot_grid(date=self._datetime, workman_id=self.workmans[0].id).as_arrays()
+
+        assert arrays["datetime_begin"].dtype == np.dtype("datetime64[s]")
+        assert len(arrays["is_occupied"]) == 8
+        assert int(arrays["is_occupied"].sum()) == 6
+
+    @pytest.mark.django_db
+    def test_workload(self, settings):
+        self.generate_data(is_range=True)
+
+        WorkRegimeExceptions.objects.create(
+            work_regime=self.work_regime, date=self._datetime.date(),
+            work_time_begin=time(hour=9), work_time_end=time(hour=12),
+        )
+        queries = [
+            {"date": self._datetime, "workman_id": self.workmans[0].id},
+            {"date": self._datetime, "repair_shop_id": self.repair_shop.id},
+            {"datetime_begin": self._datetime, "datetime_end": self._datetime_end},
+        ]
+        expected = [get_workload(**data) for data in queries]
+
+        settings.SLOT_GRID = True
+        with mock.patch.object(SlotGrid, "build", wraps=SlotGrid.build) as build:
+            assert [get_workload(**data) for data in queries] == expected
+        assert build.call_count == len(queries)
@@ -0,0 +1,116 @@
+
+from datetime import time, timedelta
+
+import pytest
+
+from core.logic.appointments_actions import make_an_appointment
+from core.logic.appointments_info import (get_all_appointments,
+                                          get_occupied_appointments)
+from core.logic.workload import get_workload
+from core.models.work_regime import WorkRegimeDetail, WorkRegimeExceptions
+from core.tests.pytests.data_generators import SimpleTestDataGenerator
+
+
+class TestWorkloadEngine(SimpleTestDataGenerator):
+
+    def _assert_same_as_processors(self, data):
+        workload = get_workload(**data)
+
+        assert workload.total == len(get_all_appointments(**data))
+        assert workload.occupied == len(get_occupied_appointments(**data))
+
+    @pytest.mark.django_db
+    def test_date(self):
+        self.generate_data()
+
+        self._assert_same_as_processors({"date": self._datetime})
+        self._assert_same_as_processors({"date": self._datetime, "repair_shop_id": self.repair_shop.id})
+        self._assert_same_as_processors({"date": self._datetime, "workman_id": self.workmans[0].id})
+
+    @pytest.mark.django_db
+    def test_date_range(self):
+        self.generate_data(is_range=True)
+
+        for shift in (timedelta(0), timedelta(minutes=30)):
+            data = {
+                "datetime_begin": self._datetime + shift,
+                "datetime_end": self._datetime_end + shift,
+            }
+
+            self._assert_same_as_processors(data)
+            self._assert_same_as_processors({**data, "repair_shop_id": self.repair_shop.id})
+            self._assert_same_as_processors({**data, "workman_id": self.workmans[0].id})
+
+    @pytest.mark.django_db
+    def test_percent(self):
+        self.generate_data()
+
+        workload = get_workload(date=self._datetime, workman_id=self.workmans[0].id)
+
+        assert workload.total == 8
+        assert workload.occupied == 6
+        assert workload.percent == 75.0
+
+    @pytest.mark.django_db
+    def test_percent_on_exception_days(self):
+        self.generate_data()
+
+        exception = WorkRegimeExceptions.objects.create(
+            work_regime=self.work_regime, date=self._datetime.date(),
+            work_time_begin=time(hour=9), work_time_end=time(hour=12),
+        )
+
+        # appointments booked after 12:00 are not on the shortened day
+        workload = get_workload(date=self._datetime, workman_id=self.workmans[0].id)
+        assert (workload.total, workload.occupied, workload.percent) == (3, 2, 66.67)
+
+        workload = get_workload(date=self._datetime, repair_shop_id=self.repair_shop.id)
+        assert (workload.total, workload.occupied, workload.percent) == (15, 6, 40.0)
+
+        self._assert_same_as_processors({"date": self._datetime, "repair_shop_id": self.repair_shop.id})
+
+        exception.is_holiday = True
+        exception.save()
+
+        workload = get_workload(date=self._datetime, workman_id=self.workmans[0].id)
+        assert (workload.total, workload.occupied, workload.percent) == (0, 0, None)
+
+    @pytest.mark.django_db
+    def test_long_appointments(self):
+        self.generate_data(is_range=True)
+
+        data = {
+            "time": self._datetime + timedelta(hours=2),
+            "workman_id": self.workmans[0].id,
+            "user_id": self.user.id,
+            "duration": 7200,
+        }
+        assert make_an_appointment(**data)[0] is False
+
+        # the appointment begins before datetime_begin but still occupies its first slot
+        data = {
+            "datetime_begin": self._datetime + timedelta(hours=3),
+            "datetime_end": self._datetime_end,
+        }
+
+        self._assert_same_as_processors(data)
+        self._assert_same_as_processors({**data, "workman_id": self.workmans[0].id})
+        assert get_occupied_appointments(**data)[0].datetime_begin == data["datetime_begin"]
+
+    @pytest.mark.django_db
+    def test_appointments_off_the_grid(self):
+        self.generate_data()
+
+        # the regime is shortened after the appointments have been booked
+        wrd = WorkRegimeDetail.objects.get(work_regime=self.work_regime, day_of_week=self._datetime.weekday())
+        wrd.work_time_end = time(hour=12)
+        wrd.save()
+
+        workload = get_workload(date=self._datetime, workman_id=self.workmans[0].id)
+        assert (workload.total, workload.occupied) == (3, 2)
+
+        workload = get_workload(date=self._datetime, repair_shop_id=self.repair_shop.id)
+        assert (workload.total, workload.occupied) == (15, 6)
+
+        self._assert_same_as_processors({"date": self._datetime})
+        self._assert_same_as_processors({"date": self._datetime, "workman_id": self.workmans[0].id})
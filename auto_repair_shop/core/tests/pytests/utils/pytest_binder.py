@@ -0,0 +1,87 @@
+
+import inspect
+import timeit
+from datetime import date, datetime
+
+import pytest
+import pytz
+
+from core.logic.appointments_actions import AppointmentArgs
+from core.logic.appointments_info import (DateProcessor,
+                                          DateRangeShopProcessor,
+                                          DateWorkmanProcessor, ProcessorArgs)
+from core.logic.custom_exceptions import (ProcessorNotFound,
+                                         WrongArgumentsHasBeenPassed)
+
+REQUEST = {
+    "date": datetime(2020, 8, 5, tzinfo=pytz.UTC),
+    "repair_shop_id": "1",
+    "timezone": "UTC",
+    "user_id": 1,
+}
+
+
+def _legacy_from_dict(env: dict) -> ProcessorArgs:
+    # binding as it was done before ArgsBinder: signature per key, if-chains per value
+    def proc_item(key, val):
+        if key == 'date':
+            if type(val) == datetime:
+                val = val.date()
+        if key in ('repair_shop_id', 'workman_id'):
+            if type(val) == str:
+                val = int(val)
+        return val
+
+    return ProcessorArgs(**{
+        k: proc_item(k, v) for k, v in env.items()
+        if k in inspect.signature(ProcessorArgs).parameters
+    })
+
+
+class TestArgsBinder(object):
+
+    def test_processor_args(self):
+        args = ProcessorArgs.from_dict({**REQUEST, "datetime_begin": "2020-08-05 10:00"})
+
+        assert args == ProcessorArgs(
+            date=date(2020, 8, 5),
+            datetime_begin=datetime(2020, 8, 5, 10, tzinfo=pytz.UTC),
+            repair_shop_id=1,
+        )
+        assert args == _legacy_from_dict({**REQUEST, "datetime_begin": args.datetime_begin})
+
+    def test_appointment_args(self):
+        args = AppointmentArgs.from_dict({"time": "2020-08-05 10:00", "duration": "7200", "workman_id": 3, "x": 1})
+        assert args == AppointmentArgs(time=datetime(2020, 8, 5, 10, tzinfo=pytz.UTC), duration=7200, workman_id=3)
+
+    @pytest.mark.parametrize("duration", ["abc", "1.5", 3600.0, True, [3600]])
+    def test_wrong_int(self, duration):
+        with pytest.raises(WrongArgumentsHasBeenPassed):
+            AppointmentArgs.from_dict({"time": "2020-08-05 10:00", "duration": duration})
+
+    @pytest.mark.parametrize("env, processor", [
+        ({"date": date(2020, 8, 5)}, DateProcessor),
+        ({"date": date(2020, 8, 5), "workman_id": 1, "repair_shop_id": 1}, DateWorkmanProcessor),
+        ({"date": date(2020, 8, 5), "datetime_begin": datetime(2020, 8, 5),
+          "datetime_end": datetime(2020, 8, 6), "workman_id": 1}, DateWorkmanProcessor),
+        ({"datetime_begin": datetime(2020, 8, 5), "datetime_end": datetime(2020, 8, 6),
+          "repair_shop_id": 1}, DateRangeShopProcessor),
+        ({"datetime_begin": datetime(2020, 8, 5), "workman_id": 1}, None),
+        ({}, None),
+    ])
+    def test_dispatch(self, env, processor):
+        args = ProcessorArgs.from_dict(env)
+        if processor is None:
+            with pytest.raises(ProcessorNotFound):
+                args.processor
+        else:
+            assert args.processor is processor
+
+    @pytest.mark.benchmark
+    def test_binding_overhead(self):
+        number = 2000
+
+        before = timeit.timeit(lambda: _legacy_from_dict(REQUEST), number=number)
+        after = timeit.timeit(lambda: ProcessorArgs.from_dict(REQUEST), number=number)
+
+        assert after < before
@@ -0,0 +1,112 @@
+
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+import pytest
+import pytz
+from django.utils.timezone import make_aware
+
+from core.utils.dateutils import (TimezoneOffsets, get_day_begin,
+                                  get_timezone_offsets, parse_date_string,
+                                  string_to_date)
+from core.utils.parser import parse_datetime
+
+TIMEZONES = ["UTC", "Europe/Moscow", "Europe/Berlin", "America/New_York"]
+
+
+def _days(first: date, count: int):
+    return [first + timedelta(days=n) for n in range(count)]
+
+
+class TestTimezoneOffsets(object):
+
+    @pytest.mark.parametrize("tz_name", TIMEZONES)
+    def test_localize(self, tz_name):
+        timezone = pytz.timezone(tz_name)
+        offsets = TimezoneOffsets(timezone)
+
+        # both DST transitions of 2020 in Europe and America
+        for _date in _days(date(2020, 3, 6), 30) + _days(date(2020, 10, 22), 14):
+            for _time in (time.min, time(2, 30), time(9), time(23, 30)):
+                try:
+                    expected = make_aware(datetime.combine(_date, _time), timezone)
+                except (pytz.NonExistentTimeError, pytz.AmbiguousTimeError) as e:
+                    with pytest.raises(type(e)):
+                        offsets.localize(_date, _time)
+                    continue
+
+                value = offsets.localize(_date, _time)
+
+                assert value == expected
+                assert value.utcoffset() == expected.utcoffset()
+
+    @pytest.mark.parametrize("tz_name", TIMEZONES)
+    def test_to_local(self, tz_name):
+        timezone = pytz.timezone(tz_name)
+        offsets = TimezoneOffsets(timezone)
+
+        value = datetime(2020, 3, 6, tzinfo=pytz.UTC)
+        while value < datetime(2020, 11, 6, tzinfo=pytz.UTC):
+            expected = value.astimezone(timezone)
+            local = offsets.to_local(value)
+
+            assert local == expected
+            assert local.replace(tzinfo=None) == expected.replace(tzinfo=None)
+            assert local.utcoffset() == expected.utcoffset()
+            value += timedelta(minutes=90)
+
+    def test_transition_days_fall_back(self):
+        offsets = TimezoneOffsets(pytz.timezone("Europe/Berlin"))
+
+        offsets.localize(date(2020, 3, 29), time.min)
+        offsets.localize(date(2020, 3, 30), time.min)
+        assert offsets._local_days[date(2020, 3, 29)] is None
+        assert offsets._local_days[date(2020, 3, 30)] is not None
+
+    def test_cleared_while_computing(self):
+        # another thread clears the tables right after the value has been stored
+        clear = staticmethod(lambda days, key, value: days.clear())
+        offsets = TimezoneOffsets(pytz.timezone("Europe/Moscow"))
+        value = datetime(2020, 8, 5, 9, tzinfo=pytz.UTC)
+
+        with mock.patch.object(TimezoneOffsets, "_store", clear):
+            assert offsets.localize(value.date(), value.time()) == make_aware(datetime(2020, 8, 5, 9), offsets.timezone)
+            assert offsets.to_local(value) == value.astimezone(offsets.timezone)
+
+    def test_shared_tables(self):
+        assert get_timezone_offsets("Europe/Berlin") is get_timezone_offsets(pytz.timezone("Europe/Berlin"))
+        assert get_day_begin(date(2020, 10, 25), "Europe/Berlin") == \
+            make_aware(datetime(2020, 10, 25), pytz.timezone("Europe/Berlin"))
+
+
+class TestParseDateString(object):
+
+    @pytest.mark.parametrize("date_string", [
+        "2020-08-05 10:30:15.123456", "2020-08-05T10:30:15.123", "2020-08-05 10:30:15.5",
+        "05.08.2020 10:30:15", "2020-08-05T10:30:15", "2020-08-05 10:30:15",
+        "05.08.2020 10:30", "2020-08-05 10:30",
+        "05.08.2020", "2020-08-05", "2020-08",
+        "2020-8-5",  # not zero-padded, parsed by the masks
+    ])
+    @pytest.mark.parametrize("tz_name", [None, "Europe/Moscow"])
+    def test_same_as_string_to_date(self, date_string, tz_name):
+        assert parse_date_string(date_string, timezone=tz_name) == string_to_date(date_string, timezone=tz_name)
+        assert parse_date_string(date_string, naive=True) == string_to_date(date_string, naive=True)
+
+    @pytest.mark.parametrize("date_string", ["2020-13-05", "31.02.2020", "UTC", "12", ""])
+    def test_wrong_strings(self, date_string):
+        with pytest.raises(ValueError):
+            parse_date_string(date_string)
+
+    def test_cached_per_timezone(self):
+        moscow = parse_date_string("2020-08-05 10:00", timezone="Europe/Moscow")
+
+        assert parse_date_string("2020-08-05 10:00", timezone="Europe/Moscow") is moscow
+        assert parse_date_string("2020-08-05 10:00") == datetime(2020, 8, 5, 10, tzinfo=pytz.UTC)
+        assert moscow == datetime(2020, 8, 5, 7, tzinfo=pytz.UTC)
+
+    def test_declared_fields_only(self):
+        data = {"date": "2020-08-05", "workman_id": "2020", "note": "2020-08"}
+        parse_datetime(data, fields=("date", "datetime_begin"))
+
+        assert data == {"date": datetime(2020, 8, 5, tzinfo=pytz.UTC), "workman_id": "2020", "note": "2020-08"}
@@ -0,0 +1,34 @@
+from core.utils.lru import LRUCache
+
+
+class TestLRUCache(object):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.keys() == ["a", "c"]
+
+    def test_invalidated_while_computing(self):
+        cache = LRUCache()
+
+        def factory():
+            # another thread invalidates the key while the stale value is being read
+            cache.invalidate(lambda key: key == "a")
+            return "stale"
+
+        assert cache.get_or_set("a", factory) == "stale"
+        assert "a" not in cache
+        assert cache.get_or_set("a", lambda: "fresh") == "fresh"
+        assert cache.get("a") == "fresh"
+
+    def test_cleared_while_computing(self):
+        cache = LRUCache()
+        generation = cache.generation
+        cache.clear()
+
+        cache.set("a", "stale", generation)
+        assert "a" not in cache
@@ -0,0 +1,61 @@
+import datetime as dt
+from dataclasses import fields
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping
+
+from core.logic.custom_exceptions import WrongArgumentsHasBeenPassed
+from core.utils.dateutils import parse_date_string
+
+
+def to_date(val):
+    if type(val) == str:
+        val = parse_date_string(val)
+    if type(val) == dt.datetime:
+        val = val.date()
+    return val
+
+
+def to_datetime(val):
+    if type(val) == str:
+        val = parse_date_string(val)
+    return val
+
+
+def to_int(val):
+    # only ints and int strings, a float duration would leak into the slot arithmetic
+    if type(val) == str:
+        return int(val)
+    if val is not None and type(val) != int:
+        raise TypeError(f"int expected, got {type(val).__name__}")
+    return val
+
+
+class ArgsBinder(object):
+    """
+        Binds a dict of request arguments to the fields of a dataclass.
+        Field names and converters are resolved once, binding is a dict lookup per key.
+    """
+
+    def __init__(self, dataclass_type: type, converters: Mapping[str, Callable[[Any], Any]]):
+        super().__init__()
+        self.dataclass_type = dataclass_type
+        self.field_names = tuple(f.name for f in fields(dataclass_type))
+        self.converters = MappingProxyType({
+            name: converters.get(name) for name in self.field_names
+        })
+
+    def bind(self, env: dict) -> Dict[str, Any]:
+        converters = self.converters
+        try:
+            return {
+                k: converters[k](v) if converters[k] is not None else v
+                for k, v in env.items() if k in converters
+            }
+        except (TypeError, ValueError) as e:
+            raise WrongArgumentsHasBeenPassed(e)
+
+    def as_kwargs(self, instance) -> Dict[str, Any]:
+        """
+            Shallow asdict() of the instance.
+        """
+        return {name: getattr(instance, name) for name in self.field_names}
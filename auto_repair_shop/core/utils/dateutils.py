@@ -1,12 +1,16 @@
 
+import re
+import threading
 from collections.abc import Iterable
-from datetime import datetime
-from typing import Union
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Dict, Optional, Tuple, Union
 
 import pytz
-from django.utils.timezone import make_aware, utc
+from django.utils.timezone import get_current_timezone, make_aware, utc
 from django.utils.translation import gettext_lazy as _
 
+from core.utils.lru import LRUCache
+
 
 def string_to_date(date_string: str,
                    formats: Union[str, Iterable] = None,
@@ -40,3 +44,162 @@ def string_to_date(date_string: str,
 
     msg = _("time data '{ds}' did not match any format {f}").format(ds=date_string, f=repr(formats))
     raise ValueError(msg)
+
+
+_ISO_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?)?")
+_DOTTED_RE = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})(?: (\d{2}):(\d{2})(?::(\d{2}))?)?")
+_YEAR_MONTH_RE = re.compile(r"(\d{4})-(\d{2})")
+
+_parsed_dates = LRUCache(maxsize=4096)
+
+
+def _parse_by_shape(date_string: str) -> Optional[datetime]:
+    """
+        Naive datetime of the default string_to_date formats recognised by their shape,
+        None when the string has another shape.
+    """
+    match = _ISO_RE.fullmatch(date_string)
+    if match:
+        fraction = match.group(7)
+        if fraction is None or len(fraction) in (3, 6):
+            return datetime.fromisoformat(date_string)
+        return datetime(*map(int, match.groups()[:6]), int(fraction.ljust(6, "0")))
+
+    match = _DOTTED_RE.fullmatch(date_string)
+    if match:
+        day, month, year, hour, minute, second = match.groups()
+        return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+
+    match = _YEAR_MONTH_RE.fullmatch(date_string)
+    if match:
+        return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+    return None
+
+
+def parse_date_string(date_string: str, timezone=None, naive: bool = False) -> datetime:
+    """
+        Same as string_to_date with the default formats: the format is recognised by the shape
+        of the string instead of trying every mask, results are cached per (string, timezone).
+        Unusual strings (e.g. not zero-padded) fall back to string_to_date.
+    """
+    if type(date_string) != str:
+        return date_string
+
+    if timezone is None:
+        timezone = utc
+    elif isinstance(timezone, str):
+        timezone = pytz.timezone(timezone)
+
+    key = (date_string, None if naive else timezone)
+    value = _parsed_dates.get(key)
+    if value is not None:
+        return value
+
+    try:
+        value = _parse_by_shape(date_string)
+    except ValueError:
+        value = None
+
+    if value is None:
+        value = string_to_date(date_string, timezone=timezone, naive=naive)
+    elif not naive:
+        value = get_timezone_offsets(timezone).localize(value.date(), value.time())
+
+    _parsed_dates.set(key, value)
+    return value
+
+
+_MISSING = object()
+
+
+class TimezoneOffsets(object):
+    """
+        UTC offsets of a timezone precomputed per day, so local datetimes are built and converted
+        by offset arithmetic instead of localising every value.
+        Days containing a DST transition have no single offset and fall back to the timezone.
+    """
+    MAX_DAYS = 8192
+
+    def __init__(self, timezone: tzinfo):
+        super().__init__()
+        self.timezone = timezone
+        self.is_pytz = hasattr(timezone, "localize")
+        self._local_days: Dict[date, Optional[tzinfo]] = {}
+        self._utc_days: Dict[date, Optional[Tuple[timedelta, tzinfo]]] = {}
+
+    @staticmethod
+    def _store(days: dict, key, value):
+        if len(days) >= TimezoneOffsets.MAX_DAYS:
+            days.clear()
+        days[key] = value
+
+    def _get_local_day(self, _date: date) -> Optional[tzinfo]:
+        # a single lookup: another thread may clear the dict between a check and a read
+        value = self._local_days.get(_date, _MISSING)
+        if value is _MISSING:
+            begin = self.timezone.localize(datetime.combine(_date, time.min), is_dst=False)
+            end = self.timezone.localize(datetime.combine(_date, time.max), is_dst=False)
+            value = begin.tzinfo if begin.utcoffset() == end.utcoffset() else None
+            self._store(self._local_days, _date, value)
+        return value
+
+    def _get_utc_day(self, _date: date) -> Optional[Tuple[timedelta, tzinfo]]:
+        value = self._utc_days.get(_date, _MISSING)
+        if value is _MISSING:
+            begin = datetime.combine(_date, time.min, tzinfo=utc).astimezone(self.timezone)
+            end = datetime.combine(_date, time.max, tzinfo=utc).astimezone(self.timezone)
+            value = (begin.utcoffset(), begin.tzinfo) if begin.utcoffset() == end.utcoffset() else None
+            self._store(self._utc_days, _date, value)
+        return value
+
+    def localize(self, _date: date, _time: time) -> datetime:
+        """
+            Same as make_aware(datetime.combine(_date, _time), timezone).
+        """
+        if not self.is_pytz:
+            return datetime.combine(_date, _time, tzinfo=self.timezone)
+
+        day_tzinfo = self._get_local_day(_date)
+        if day_tzinfo is None:
+            return make_aware(datetime.combine(_date, _time), self.timezone)
+        return datetime.combine(_date, _time, tzinfo=day_tzinfo)
+
+    def to_local(self, value: datetime) -> datetime:
+        """
+            Same as value.astimezone(timezone).
+        """
+        utc_value = (value - value.utcoffset()).replace(tzinfo=None)
+        day = self._get_utc_day(utc_value.date())
+        if day is None:
+            return value.astimezone(self.timezone)
+
+        offset, day_tzinfo = day
+        return (utc_value + offset).replace(tzinfo=day_tzinfo)
+
+
+_timezone_offsets: Dict[tzinfo, TimezoneOffsets] = {}
+_timezone_offsets_lock = threading.Lock()
+
+
+def get_timezone_offsets(timezone: Union[tzinfo, str] = None) -> TimezoneOffsets:
+    """
+        Shared offset tables of the timezone (current timezone by default).
+    """
+    if timezone is None:
+        timezone = get_current_timezone()
+    elif isinstance(timezone, str):
+        timezone = pytz.timezone(timezone)
+
+    offsets = _timezone_offsets.get(timezone)
+    if offsets is None:
+        with _timezone_offsets_lock:
+            offsets = _timezone_offsets.setdefault(timezone, TimezoneOffsets(timezone))
+    return offsets
+
+
+def get_day_begin(_date: date, timezone=None) -> datetime:
+    """
+        Aware midnight of the date (current timezone by default).
+    """
+    return get_timezone_offsets(timezone).localize(_date, time.min)
@@ -2,7 +2,7 @@
 from collections.abc import Iterable
 from typing import Union
 
-from core.utils.dateutils import string_to_date
+from core.utils.dateutils import parse_date_string
 
 
 def _parse_request(request, method: str, fields: Union[str, Iterable]) -> dict:
@@ -22,10 +22,11 @@ def _parse_request(request, method: str, fields: Union[str, Iterable]) -> dict:
     return data
 
 
-def parse_datetime(data, timezone=None):
-    for k, v in data.items():
+def parse_datetime(data, timezone=None, fields: Union[str, Iterable] = "__all__"):
+    keys = list(data) if fields == "__all__" else [field for field in fields if field in data]
+    for k in keys:
         try:
-            data[k] = string_to_date(v, timezone=timezone)
+            data[k] = parse_date_string(data[k], timezone=timezone)
         except ValueError:
             pass
     return data
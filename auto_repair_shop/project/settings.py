@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RequestScopeMiddleware',
 ]
 
 REST_FRAMEWORK = {
@@ -138,3 +139,51 @@ CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 LOGIN_REDIRECT_URL = 'home'
 LOGIN_URL = 'login'
+
+# Max number of cached work regime details/exceptions/schedules per process
+WORK_REGIME_CACHE_SIZE = 4096
+
+# Executor of the shop-agnostic DateProcessor/DateRangeProcessor:
+# None (serial), "thread" (per-regime DB access in threads) or "process" (slot expansion in processes)
+APPOINTMENTS_EXECUTOR = None
+APPOINTMENTS_EXECUTOR_WORKERS = 4
+# days of a date range processed by a single task
+APPOINTMENTS_EXECUTOR_DAYS_CHUNK = 7
+
+# In-memory bitmap of booked slots per workman-day (core.logic.occupancy_index).
+# Enable only when all bookings go through a single process.
+OCCUPANCY_INDEX = False
+OCCUPANCY_INDEX_SIZE = 65536
+
+# Workload counted by the vectorised slot grid (core.logic.slot_grid), requires numpy
+SLOT_GRID = False
+
+# Materialised slots table (core.logic.slot_availability), extended nightly by
+# "manage.py extend_slot_availability"
+SLOT_AVAILABILITY = False
+SLOT_AVAILABILITY_HORIZON_DAYS = 60
+
+# Search horizon of core.logic.next_available (days)
+NEXT_AVAILABLE_MAX_DAYS = 366
+# Max number of slots returned by the find_next_available endpoint
+NEXT_AVAILABLE_MAX_LIMIT = 100
+
+# Max number of query specs accepted by the batch_availability endpoint
+BATCH_AVAILABILITY_MAX_QUERIES = 100
+# Max number of appointments created/moved/deleted by a single bulk_appointments request
+BULK_APPOINTMENTS_MAX_ITEMS = 100
+
+# Lifetime of the stored responses of requests sent with an Idempotency-Key header (seconds)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+# a key still without response after this many seconds belongs to a request that died, it can be claimed again
+IDEMPOTENCY_KEY_PENDING_TIMEOUT = 60
+# expired keys are deleted at most once per interval (seconds) by the requests of a process,
+# 0 leaves it to "manage.py purge_idempotency_keys"
+IDEMPOTENCY_KEY_PURGE_INTERVAL = 60 * 60
+# the oldest keys of a customer are evicted beyond this amount
+IDEMPOTENCY_KEY_MAX_PER_CUSTOMER = 1000
+
+# Bookings applied by a single writer thread in batched transactions (core.logic.booking_queue),
+# avoids "database is locked" errors of concurrent SQLite writers. Coordinates a single process only.
+BOOKING_QUEUE = False
+BOOKING_QUEUE_BATCH_SIZE = 64